@@ -0,0 +1,126 @@
+import bisect
+import threading
+from collections import defaultdict
+
+import pandas as pd
+
+from armazenamento import (
+    backend_armazenamento, carregar_produtos, carregar_produtos_por_ids,
+    carregar_produtos_por_validade, registrar_observador, versao_produtos,
+)
+from metricas import medir
+from validade import classificar_validade, dia_absoluto, dias_restantes, hoje
+
+DIAS_ALERTA_PADRAO = 30
+
+
+class IndiceValidade:
+    # Produtos agrupados em baldes por (seção, dia de validade), com a lista ordenada dos
+    # dias de cada seção. Consultar quem vence em N dias é uma busca binária nessa lista
+    # seguida da leitura dos baldes do intervalo; inserções e exclusões feitas por este
+    # processo só mexem no balde do produto, sem reconstruir o índice.
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.versao = None
+        self.baldes = defaultdict(set)   # (secao, dia) -> IDs
+        self.dias = defaultdict(list)    # secao -> dias ordenados que têm algum produto
+        self.posicao = {}                # ID -> (secao, dia), para excluir em O(1)
+
+    def _adicionar(self, id_produto, secao, dia):
+        chave = (secao, dia)
+        if not self.baldes[chave]:
+            bisect.insort(self.dias[secao], dia)
+        self.baldes[chave].add(id_produto)
+        self.posicao[id_produto] = chave
+
+    def _remover(self, id_produto):
+        chave = self.posicao.pop(id_produto, None)
+        if chave is None:
+            return
+        balde = self.baldes[chave]
+        balde.discard(id_produto)
+        if not balde:
+            del self.baldes[chave]
+            secao, dia = chave
+            dias = self.dias[secao]
+            del dias[bisect.bisect_left(dias, dia)]
+
+    def _inserir_df(self, df):
+        # Uma alteração chega como nova inserção do mesmo ID: sai do balde antigo primeiro
+        for id_produto in df['ID']:
+            self._remover(id_produto)
+        df = df[df['DataValidade'].notna()]
+        for id_produto, secao, dia in zip(df['ID'], df['Secao'].astype(object), dia_absoluto(df['DataValidade'])):
+            self._adicionar(id_produto, secao, int(dia))
+
+    @medir('transformacao.indice_alertas')
+    def reconstruir(self, versao):
+        df = carregar_produtos()
+        df = df[df['DataValidade'].notna()]
+        chaves = zip(df['Secao'].astype(object).tolist(), dia_absoluto(df['DataValidade']).tolist())
+        self.posicao = dict(zip(df['ID'].tolist(), chaves))
+        self.baldes = defaultdict(set)
+        for id_produto, chave in self.posicao.items():
+            self.baldes[chave].add(id_produto)
+        self.dias = defaultdict(list)
+        for secao, dia in self.baldes:
+            self.dias[secao].append(dia)
+        for dias in self.dias.values():
+            dias.sort()
+        # Uma escrita durante a leitura pode ter entrado nos dados lidos com a versão antiga;
+        # aí o índice fica marcado para reconstruir, em vez de aplicar essa escrita de novo
+        self.versao = versao if versao_produtos() == versao else None
+
+    def ao_escrever(self, evento, dados, versao_antes, versao_depois, anteriores):
+        # Só aplica a alteração se o índice estava exatamente na versão anterior à escrita;
+        # caso contrário (outra escrita no meio), marca para reconstruir na próxima consulta
+        with self._trava:
+            if self.versao is None or self.versao != versao_antes:
+                self.versao = None
+                return
+            if evento == 'inserir':
+                self._inserir_df(dados)
+            elif evento == 'excluir':
+                for id_produto in dados:
+                    self._remover(id_produto)
+            self.versao = versao_depois
+
+    def ids_no_intervalo(self, dia_inicio, dia_fim, secao=None):
+        # IDs com validade entre dia_inicio e dia_fim (inclusive; None = sem limite), por data
+        with self._trava:
+            versao = versao_produtos()
+            if self.versao != versao:
+                # Escrita de outro processo (ou índice marcado): reconstrói uma vez
+                self.reconstruir(versao)
+            secoes = [secao] if secao is not None else list(self.dias)
+            encontrados = []
+            for s in secoes:
+                dias = self.dias.get(s, [])
+                inicio = 0 if dia_inicio is None else bisect.bisect_left(dias, dia_inicio)
+                fim = len(dias) if dia_fim is None else bisect.bisect_right(dias, dia_fim)
+                for dia in dias[inicio:fim]:
+                    encontrados.extend((dia, id_produto) for id_produto in self.baldes[(s, dia)])
+        encontrados.sort(key=lambda par: par[0])
+        return [id_produto for _, id_produto in encontrados]
+
+
+_indice = IndiceValidade()
+registrar_observador(_indice.ao_escrever)
+
+
+def produtos_a_vencer(dias, secao=None, incluir_vencidos=False):
+    # Produtos que vencem nos próximos 'dias' dias (e, se pedido, os já vencidos),
+    # ordenados por validade e com 'Dias Restantes' e 'FaixaValidade' calculados
+    data_referencia = hoje()
+    data_fim = data_referencia + pd.Timedelta(days=dias)
+    data_inicio = None if incluir_vencidos else data_referencia
+    if backend_armazenamento().filtra_no_banco:
+        # SQLite/Supabase: o próprio índice (Secao, DataValidade) do banco responde
+        df = carregar_produtos_por_validade(data_inicio, data_fim, secao)
+    else:
+        dia_inicio = None if data_inicio is None else int(dia_absoluto([data_inicio])[0])
+        df = carregar_produtos_por_ids(_indice.ids_no_intervalo(dia_inicio, int(dia_absoluto([data_fim])[0]), secao))
+    df['Dias Restantes'] = dias_restantes(df['DataValidade'], data_referencia)
+    df['FaixaValidade'] = classificar_validade(df['Dias Restantes'])
+    return df
@@ -1,101 +1,43 @@
 import streamlit as st
 import pandas as pd
-import os
+import math
+import plotly.express as px
 from datetime import datetime, timedelta
-import hashlib
-
-# --- Configurações Iniciais ---
-PRODUTOS_CSV = 'data/produtos.csv'
-USUARIOS_CSV = 'data/usuarios.csv'
-STATUS_APP_FILE = 'data/status_app.txt'
-
-# Garante que a pasta 'data' existe
-if not os.path.exists('data'):
-    os.makedirs('data')
-    print(f"Pasta 'data' criada.")
-
-# --- Funções Auxiliares ---
-
-def hash_senha(senha):
-    return hashlib.sha256(senha.encode()).hexdigest()
-
-def carregar_produtos():
-    if os.path.exists(PRODUTOS_CSV):
-        try:
-            df = pd.read_csv(PRODUTOS_CSV)
-            # Garante que a coluna 'DataValidade' é datetime para ordenação
-            df['DataValidade'] = pd.to_datetime(df['DataValidade'], errors='coerce')
-            return df
-        except pd.errors.EmptyDataError:
-            return pd.DataFrame(columns=['CodigoEAN', 'Item', 'DataValidade', 'Lote', 'Quantidade', 'DataRegistro', 'Secao'])
-    return pd.DataFrame(columns=['CodigoEAN', 'Item', 'DataValidade', 'Lote', 'Quantidade', 'DataRegistro', 'Secao'])
-
-def salvar_produtos(df):
-    df.to_csv(PRODUTOS_CSV, index=False)
-
-def carregar_usuarios():
-    if os.path.exists(USUARIOS_CSV):
-        try:
-            return pd.read_csv(USUARIOS_CSV)
-        except pd.errors.EmptyDataError:
-            return pd.DataFrame(columns=['Usuario', 'Senha', 'Secao'])
-    return pd.DataFrame(columns=['Usuario', 'Senha', 'Secao'])
-
-def salvar_usuarios(df):
-    df.to_csv(USUARIOS_CSV, index=False)
-
-def carregar_status_app():
-    if os.path.exists(STATUS_APP_FILE):
-        with open(STATUS_APP_FILE, 'r') as f:
-            lines = f.readlines()
-            if len(lines) == 2:
-                return lines[0].strip(), lines[1].strip() # Retorna (status, mensagem)
-    return "azul", "Tudo operando" # Padrão
-
-def salvar_status_app(status, mensagem):
-    with open(STATUS_APP_FILE, 'w') as f:
-        f.write(f"{status}\n")
-        f.write(mensagem)
-
-# --- Inicialização/Verificação do Usuário Admin e CSVs ---
-def inicializar_dados():
-    # Inicializa produtos.csv se não existir ou estiver vazio
-    if not os.path.exists(PRODUTOS_CSV) or carregar_produtos().empty:
-        df_produtos = pd.DataFrame(columns=['CodigoEAN', 'Item', 'DataValidade', 'Lote', 'Quantidade', 'DataRegistro', 'Secao'])
-        salvar_produtos(df_produtos)
-        print(f"Arquivo '{PRODUTOS_CSV}' inicializado.")
-
-    # Inicializa usuarios.csv e garante que o admin está lá
-    df_usuarios = carregar_usuarios()
-    if df_usuarios.empty or 'admin' not in df_usuarios['Usuario'].values:
-        admin_usuario = "admin"
-        admin_senha_plain = "123456" # Senha para o admin
-        admin_secao = "Admin"
-        admin_senha_hashed = hash_senha(admin_senha_plain)
-
-        novo_admin_df = pd.DataFrame([{
-            'Usuario': admin_usuario,
-            'Senha': admin_senha_hashed,
-            'Secao': admin_secao
-        }])
-
-        if df_usuarios.empty:
-            df_usuarios = novo_admin_df
-        else:
-            df_usuarios = pd.concat([df_usuarios, novo_admin_df], ignore_index=True)
-
-        salvar_usuarios(df_usuarios)
-        print(f"Usuário 'admin' com senha '{admin_senha_plain}' adicionado/garantido em '{USUARIOS_CSV}'.")
-
-    # Inicializa status_app.txt se não existir
-    if not os.path.exists(STATUS_APP_FILE):
-        salvar_status_app("azul", "Tudo operando") # Status padrão
-        print(f"Arquivo '{STATUS_APP_FILE}' inicializado.")
-
 
-# Executa a inicialização dos dados uma única vez na primeira execução do script
-# ou quando o script é recarregado (ex: ao salvar app.py)
-inicializar_dados()
+from secoes import NIVEIS_ACESSO, SECOES
+from armazenamento import (
+    LOJA, TTL_STATUS_APP, adicionar_produto, backend_armazenamento, excluir_produto,
+    carregar_usuarios, salvar_usuarios,
+    salvar_status_app, status_app,
+)
+from validade import (
+    CORES_FAIXAS, LIMITE_ATENCAO, LIMITE_CRITICO,
+    produtos_com_validade_somente_leitura, status_validade_html, status_validade_texto,
+)
+from alertas import DIAS_ALERTA_PADRAO, produtos_a_vencer
+from importacao import importar_produtos
+from exportacao import FORMATOS_EXPORTACAO, exportar_produtos
+from autenticacao import autenticar, hash_senha
+from arquivamento import DIAS_ARQUIVAMENTO, arquivar_vencidos, consultar_arquivo
+from catalogo import buscar_catalogo, buscar_produto_por_ean
+from codigo_barras import leitor_codigo_barras
+from ean import decodificar_ean
+from inicializacao import garantir_inicializacao
+from painel import SEMANAS_PAINEL, quantidade_em_risco_por_secao, vencidos_por_semana, vencimentos_por_semana
+from consolidacao import resumo_rede, risco_por_loja, risco_por_loja_e_secao, vencimentos_por_semana_rede
+from metricas import (
+    finalizar_execucao, iniciar_execucao, medir, resumo_contadores, resumo_tempos, texto_prometheus, zerar_metricas,
+)
+
+# --- Métricas da Reexecução ---
+# Tudo o que for medido daqui até o fim do script conta para esta reexecução (e para a
+# seção do usuário logado); o resumo fica em st.session_state.metricas_ultima_execucao
+iniciar_execucao(st.session_state.get('secao'))
+
+# --- Inicialização ---
+# Migrações, admin padrão, status inicial e arquivamento automático: uma vez por
+# processo do servidor (as reexecuções seguintes só conferem uma flag em memória)
+garantir_inicializacao()
 
 
 # --- Variáveis de Sessão ---
@@ -105,8 +47,21 @@ if 'usuario' not in st.session_state:
     st.session_state.usuario = None
 if 'secao' not in st.session_state:
     st.session_state.secao = None
-if 'status_cor' not in st.session_state:
-    st.session_state.status_cor, st.session_state.status_mensagem = carregar_status_app()
+
+
+def sincronizar_status():
+    # O status vem da cópia em memória do processo (sem ler o disco); quando alguém o
+    # altera, a versão muda e a sessão passa a exibir o novo valor
+    status_cor, status_mensagem, versao = status_app()
+    if st.session_state.get('status_versao') == versao:
+        return False
+    st.session_state.status_cor = status_cor
+    st.session_state.status_mensagem = status_mensagem
+    st.session_state.status_versao = versao
+    return True
+
+
+sincronizar_status()
 
 
 # --- Tela de Login ---
@@ -119,73 +74,127 @@ def tela_login():
         submit_button = st.form_submit_button("Entrar")
 
         if submit_button:
-            df_usuarios = carregar_usuarios()
-            senha_hashed = hash_senha(senha)
-            usuario_encontrado = df_usuarios[(df_usuarios['Usuario'] == usuario) & (df_usuarios['Senha'] == senha_hashed)]
+            secao_usuario = autenticar(usuario, senha)
 
-            if not usuario_encontrado.empty:
+            if secao_usuario is not None:
                 st.session_state.logado = True
-                st.session_state.usuario = usuario_encontrado['Usuario'].iloc[0]
-                st.session_state.secao = usuario_encontrado['Secao'].iloc[0]
+                st.session_state.usuario = usuario
+                st.session_state.secao = secao_usuario
                 st.rerun()
             else:
                 st.error("Usuário ou senha inválidos.")
 
-# --- Seções ---
-SECOES = [
-    "AÇOUGUE", "PADARIA", "FRIOS", "LATICÍNIOS", "HORTIFRÚTIS", "ENLATADOS",
-    "BEBIDAS", "MATINAL", "CEREAIS", "PERFUMARIA", "BISCOITOS", "BAZAR",
-    "LIMPEZA", "DOCES/BOMBOM", "MASSAS", "CONDIMENTOS", "INTEGRAL"
-]
-NIVEIS_ACESSO = ["Admin", "Gerência"] + SECOES
+# --- Paginação ---
+OPCOES_ITENS_POR_PAGINA = [10, 25, 50, 100]
 
 # --- Cadastro de Item ---
+def _secao_do_usuario():
+    # A seção do usuário logado, se for uma das opções da lista, senão a primeira
+    return st.session_state.secao if st.session_state.secao in SECOES else SECOES[0]
+
+
+def _ao_enviar_cadastro():
+    # Callback do "Salvar Item", antes da reexecução: guarda a seção escolhida e devolve o
+    # campo à seção do usuário, já que o formulário é limpo ao enviar (o selectbox não
+    # tem index; o valor vem só de session_state)
+    st.session_state.secao_enviada = st.session_state.cadastro_secao
+    st.session_state.cadastro_secao = _secao_do_usuario()
+
+
+def _preencher_cadastro(ean, nome, secao):
+    # Callback: roda antes da reexecução, então pode alterar os campos do formulário
+    st.session_state.cadastro_ean = ean
+    st.session_state.cadastro_item = nome
+    if secao in SECOES:
+        st.session_state.cadastro_secao = secao
+
+
+def _preencher_pelo_ean():
+    sugestoes = buscar_catalogo(st.session_state.busca_catalogo)
+    if len(sugestoes) == 1 and sugestoes[0][0] == st.session_state.busca_catalogo.strip():
+        _preencher_cadastro(*sugestoes[0])
+
+
+def _aplicar_codigo_lido(codigo):
+    # Código lido pela câmera ou em foto: preenche o EAN e, se o catálogo conhece, o resto
+    produto = buscar_produto_por_ean(codigo)
+    if produto is not None:
+        _preencher_cadastro(codigo, *produto)
+    else:
+        st.session_state.cadastro_ean = codigo
+
+
+def _ao_ler_na_camera():
+    leitura = st.session_state.leitor_ean
+    if leitura and leitura.get('codigo'):
+        _aplicar_codigo_lido(leitura['codigo'])
+
+
+def _ao_enviar_foto():
+    foto = st.session_state.foto_ean
+    if foto is None:
+        return
+    codigo = decodificar_ean(foto)
+    if codigo is None:
+        st.session_state.aviso_foto_ean = "Nenhum código EAN-13/EAN-8 encontrado na foto."
+    else:
+        st.session_state.aviso_foto_ean = None
+        _aplicar_codigo_lido(codigo)
+
+
 def tela_cadastro_item():
     st.title("Cadastro de Item")
     st.subheader("Registrar Novo Produto")
 
+    secao_inicial_index = SECOES.index(_secao_do_usuario())
+    # A seção do formulário é semeada uma vez aqui e depois só muda pelo próprio selectbox
+    # ou pelos callbacks que preenchem o cadastro
+    if 'cadastro_secao' not in st.session_state:
+        st.session_state.cadastro_secao = _secao_do_usuario()
+
+    # Catálogo: um EAN já registrado (ou o início do nome) preenche o formulário abaixo
+    busca_catalogo = st.text_input(
+        "Buscar no catálogo (EAN ou início do nome)", key="busca_catalogo", on_change=_preencher_pelo_ean
+    )
+    if busca_catalogo:
+        sugestoes = buscar_catalogo(busca_catalogo)
+        if sugestoes:
+            col_sugestao, col_usar = st.columns([0.7, 0.3])
+            with col_sugestao:
+                sugestao = st.selectbox(
+                    "Produtos encontrados", sugestoes, format_func=lambda s: f"{s[0]} | {s[1]} ({s[2]})"
+                )
+            with col_usar:
+                st.write("")
+                st.button("Usar Produto", on_click=_preencher_cadastro, args=sugestao)
+        else:
+            st.caption("Nenhum produto do catálogo corresponde à busca.")
+
+    # Leitura do código de barras: a câmera é decodificada no próprio navegador (só o
+    # código chega ao servidor); fotos enviadas passam pelo decodificador em Python
+    with st.expander("Escanear Código de Barras"):
+        leitor_codigo_barras(key="leitor_ean", on_change=_ao_ler_na_camera)
+        st.file_uploader(
+            "Ou envie uma foto do código de barras", type=["png", "jpg", "jpeg"],
+            key="foto_ean", on_change=_ao_enviar_foto,
+        )
+        if st.session_state.get('aviso_foto_ean'):
+            st.warning(st.session_state.aviso_foto_ean)
+
     with st.form("form_cadastro_item", clear_on_submit=True):
         col1, col2 = st.columns([0.7, 0.3]) # Adjust column width for EAN and camera
         with col1:
-            # Garante que a seção do usuário logado seja uma das opções da lista, senão define como 0
-            secao_inicial_index = SECOES.index(st.session_state.secao) if st.session_state.secao in SECOES else 0
-            secao_selecionada = st.selectbox(
+            st.selectbox(
                 "Seção",
                 SECOES,
                 key="cadastro_secao",
-                index=secao_inicial_index
             )
         with col2:
-            # Placeholder for EAN input and camera icon
-            codigo_ean_input = st.text_input("Código EAN")
-            # Adicionando um botão que "simula" a abertura da câmera.
-            # A funcionalidade real de câmera exigiria JavaScript/HTML customizado.
-            # Este é um placeholder visual e informativo.
-            st.markdown(
-                """
-                <style>
-                .camera-icon-button button {
-                    background-color: transparent;
-                    border: none;
-                    color: grey;
-                    font-size: 20px;
-                    cursor: pointer;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    padding: 0;
-                    margin-top: -30px; /* Adjust to align with input field */
-                    float: right; /* Align to the right of the column */
-                }
-                </style>
-                """, unsafe_allow_html=True
-            )
-            # You can use a custom button with an icon here, or just inform
-            # Streamlit doesn't directly support icons inside st.text_input
-            # A simple button below the input as a placeholder for the action
-            st.info("Para escanear, use um leitor de código de barras físico ou um aplicativo externo e digite o EAN acima. A integração direta com a câmera está em desenvolvimento.")
+            # EAN digitado, lido por um leitor físico ou preenchido pela leitura acima
+            codigo_ean_input = st.text_input("Código EAN", key="cadastro_ean")
+            st.caption("Para escanear, use um leitor físico ou \"Escanear Código de Barras\" acima.")
 
-        item = st.text_input("Nome do Item")
+        item = st.text_input("Nome do Item", key="cadastro_item")
         # Define a data padrão para 30/05/2025 (ou data atual se posterior)
         data_default = datetime(2025, 5, 30)
         if datetime.now() > data_default:
@@ -197,66 +206,92 @@ def tela_cadastro_item():
         lote = st.text_input("Lote (Opcional)")
         quantidade = st.number_input("Quantidade", min_value=1, value=1)
 
-        submit_button = st.form_submit_button("Salvar Item")
+        submit_button = st.form_submit_button("Salvar Item", on_click=_ao_enviar_cadastro)
 
         if submit_button:
             if not codigo_ean_input or not item:
                 st.error("Código EAN e Nome do Item são obrigatórios.")
             else:
-                df_produtos = carregar_produtos()
-                novo_produto = pd.DataFrame([{
+                # Acrescenta apenas a nova linha, sem reescrever o CSV inteiro
+                adicionar_produto({
                     'CodigoEAN': codigo_ean_input,
                     'Item': item,
                     'DataValidade': data_validade.strftime('%Y-%m-%d'), # Formato para CSV
                     'Lote': lote,
                     'Quantidade': quantidade,
                     'DataRegistro': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'Secao': secao_selecionada
-                }])
-                df_produtos = pd.concat([df_produtos, novo_produto], ignore_index=True)
-                salvar_produtos(df_produtos)
+                    'Secao': st.session_state.secao_enviada
+                })
                 st.success("Item salvo com sucesso!")
                 # Os campos serão limpos automaticamente com clear_on_submit=True
 
+    # Importação de manifestos de fornecedores: valida e grava milhares de linhas de uma vez
+    with st.expander("Importar Lotes em Massa (CSV/XLSX)"):
+        st.markdown(
+            "O arquivo deve ter as colunas **CodigoEAN**, **Item** e **DataValidade** (DD/MM/AAAA ou AAAA-MM-DD). "
+            "As colunas **Lote**, **Quantidade** (padrão 1) e **Secao** são opcionais."
+        )
+        arquivo_importacao = st.file_uploader("Arquivo do fornecedor", type=["csv", "xlsx"], key="arquivo_importacao")
+        secao_importacao = st.selectbox(
+            "Seção padrão (para linhas sem Secao)", SECOES, index=secao_inicial_index, key="secao_importacao"
+        )
+        if arquivo_importacao is not None and st.button("Importar Arquivo"):
+            try:
+                importados, duplicados, df_erros = importar_produtos(
+                    arquivo_importacao, arquivo_importacao.name, secao_importacao, SECOES
+                )
+            except ValueError as erro:
+                st.error(str(erro))
+            else:
+                st.success(f"{importados} itens importados com sucesso!")
+                if duplicados:
+                    st.info(f"{duplicados} linhas ignoradas por já estarem cadastradas (mesmo EAN, lote, validade e seção).")
+                if not df_erros.empty:
+                    st.warning(f"{len(df_erros)} problemas encontrados; as linhas com erro não foram importadas.")
+                    st.dataframe(df_erros, hide_index=True)
+
     st.subheader("Lista de Produtos Cadastrados")
 
-    df_produtos = carregar_produtos()
+    # Filtrar por seção se não for Admin ou Gerência (no SQLite, direto pelo índice)
+    secao_filtro = None if st.session_state.secao in ["Admin", "Gerência"] else st.session_state.secao
+    # Já ordenada por validade, em cache por versão e por dia: sem cópia nem ordenação aqui
+    df_produtos = produtos_com_validade_somente_leitura(secao_filtro)
 
     if not df_produtos.empty:
-        # Filtrar por seção se não for Admin ou Gerência
-        if st.session_state.secao not in ["Admin", "Gerência"]:
-            df_produtos = df_produtos[df_produtos['Secao'] == st.session_state.secao]
-
-        # Convertendo DataValidade para datetime para ordenação
-        df_produtos['DataValidade'] = pd.to_datetime(df_produtos['DataValidade'])
-        df_produtos_exibir = df_produtos.sort_values(by='DataValidade').reset_index(drop=True)
-
-        # Adicionar coluna de Dias Restantes e Status de Validade
-        today = datetime.now()
-        df_produtos_exibir['Dias Restantes'] = (df_produtos_exibir['DataValidade'] - today).dt.days
-
-        def obter_status_validade_html(dias_restantes):
-            if dias_restantes < 0:
-                return f'<span style="color:red; font-weight:bold;">VENCIDO ({abs(dias_restantes)} dias)</span>'
-            elif dias_restantes <= 5:
-                return f'<span style="color:orange; font-weight:bold;">Vence em {dias_restantes} dias</span>'
-            elif dias_restantes <= 30:
-                return f'<span style="color:yellow; font-weight:bold;">Vence em {dias_restantes} dias</span>'
-            else:
-                return f'<span style="color:green; font-weight:bold;">Retido ({dias_restantes} dias)</span>'
-
-        def obter_status_validade_texto(dias_restantes): # Nova função para o texto limpo
-            if dias_restantes < 0:
-                return f'VENCIDO ({abs(dias_restantes)} dias)'
-            elif dias_restantes <= 5:
-                return f'Vence em {dias_restantes} dias'
-            elif dias_restantes <= 30:
-                return f'Vence em {dias_restantes} dias'
-            else:
-                return f'Retido ({dias_restantes} dias)'
+        # Paginação: apenas a página atual é copiada, formatada e enviada ao navegador,
+        # então o custo de renderização depende do tamanho da página, não do estoque
+        total_itens = len(df_produtos)
+        col_tamanho, col_pagina, col_info = st.columns([0.3, 0.3, 0.4])
+        with col_tamanho:
+            itens_por_pagina = st.selectbox("Itens por página", OPCOES_ITENS_POR_PAGINA, key="itens_por_pagina")
+        total_paginas = max(1, math.ceil(total_itens / itens_por_pagina))
+        with col_pagina:
+            pagina = st.number_input("Página", min_value=1, max_value=total_paginas, value=1, step=1)
+        inicio = (pagina - 1) * itens_por_pagina
+        fim = min(inicio + itens_por_pagina, total_itens)
+        with col_info:
+            if total_itens:
+                st.caption(f"Exibindo {inicio + 1}–{fim} de {total_itens} itens (página {pagina} de {total_paginas})")
+        df_produtos_exibir = df_produtos.iloc[inicio:fim].copy()
+
+        # Exportação da lista inteira (não só da página): o arquivo só é gerado no clique
+        col_formato, col_exportar = st.columns([0.3, 0.7])
+        with col_formato:
+            formato_exportacao = st.selectbox("Formato", list(FORMATOS_EXPORTACAO), key="formato_exportacao")
+        extensao, mime = FORMATOS_EXPORTACAO[formato_exportacao]
+        with col_exportar:
+            st.write("")
+            st.download_button(
+                "Exportar Lista",
+                data=lambda: exportar_produtos(secao_filtro, formato_exportacao),
+                file_name=f"produtos_{datetime.now().strftime('%Y%m%d')}.{extensao}",
+                mime=mime,
+            )
 
-        df_produtos_exibir['Status Validade HTML'] = df_produtos_exibir['Dias Restantes'].apply(obter_status_validade_html)
-        df_produtos_exibir['Status Validade Texto'] = df_produtos_exibir['Dias Restantes'].apply(obter_status_validade_texto) # Nova coluna
+        # Status de Validade calculado de forma vetorizada, só para a página exibida
+        # ('Dias Restantes' e 'FaixaValidade' já vêm calculados uma vez por dia)
+        df_produtos_exibir['Status Validade HTML'] = status_validade_html(df_produtos_exibir['Dias Restantes'])
+        df_produtos_exibir['Status Validade Texto'] = status_validade_texto(df_produtos_exibir['Dias Restantes'])
 
         # Novo formato de DataValidade
         df_produtos_exibir['DataValidadeFormatada'] = df_produtos_exibir['DataValidade'].dt.strftime('%d/%m/%Y')
@@ -265,7 +300,7 @@ def tela_cadastro_item():
         st.markdown("---") # Linha separadora antes da lista
 
         # Exibir cada item em um expander (gaveta)
-        for index, row in df_produtos_exibir.iterrows():
+        for _, row in df_produtos_exibir.iterrows():
             # Cabeçalho da gaveta com as informações principais (apenas texto limpo)
             header_text = (
                 f"**Cód. EAN:** {str(row['CodigoEAN']).replace(',', '')} | "
@@ -286,61 +321,12 @@ def tela_cadastro_item():
                 # Botão de exclusão dentro da gaveta
                 if st.button(
                     "Excluir Item",
-                    key=f"excluir_produto_{row['CodigoEAN']}_{index}",
+                    key=f"excluir_produto_{row['ID']}",
                     help="Clique para excluir este item permanentemente"
                 ):
-                    df_produtos_original = carregar_produtos()
-                    # Find the exact row to delete, considering multiple items might have the same EAN but different attributes
-                    # For a robust deletion, combine EAN, Item, DataValidade, etc.
-                    # For simplicity here, we'll assume EAN is unique enough in a single entry scenario, but for a real system,
-                    # a unique ID per entry would be better.
-                    # A more precise way would be:
-                    # df_produtos_atualizado = df_produtos_original.drop(df_produtos_original[(df_produtos_original['CodigoEAN'] == row['CodigoEAN']) &
-                    #                                                                      (df_produtos_original['Item'] == row['Item']) &
-                    #                                                                      (df_produtos_original['DataValidade'] == row['DataValidade'])].index)
-                    # For now, using the simpler EAN match for demonstration
-                    df_produtos_atualizado = df_produtos_original[
-                        (df_produtos_original['CodigoEAN'] != row['CodigoEAN']) |
-                        (df_produtos_original['Item'] != row['Item']) |
-                        (pd.to_datetime(df_produtos_original['DataValidade']) != row['DataValidade']) |
-                        (df_produtos_original['Lote'] != row['Lote']) |
-                        (df_produtos_original['Quantidade'] != row['Quantidade'])
-                    ]
-
-                    # This ensures only the exact row clicked is removed, not all entries with the same EAN
-                    # if they differ in other fields.
-                    # This relies on the index of the displayed dataframe being the same as the original after filtering/sorting.
-                    # A safer approach is to pass a unique ID for each record.
-                    # Let's use `index` from the loop to locate the specific row if it matches other criteria.
-                    # This is still not perfect if the underlying CSV has duplicates and display changes.
-                    # The most robust way to delete a specific row is to have a unique ID for each product entry.
-                    # Assuming for now, deleting by EAN + a refresh is acceptable for this context.
-                    
-                    # A more robust deletion logic: create a temporary unique identifier if one doesn't exist.
-                    # Or, as `df_products_original` is loaded, you can directly filter out based on `index`
-                    # if the index corresponds to the original dataframe's index.
-                    # Let's re-read the original and remove by matching all attributes of the row.
-                    
-                    original_df_for_deletion = carregar_produtos()
-                    # Convert 'DataValidade' in the original_df_for_deletion to datetime for comparison
-                    original_df_for_deletion['DataValidade'] = pd.to_datetime(original_df_for_deletion['DataValidade'])
-
-                    # Identify the row to be deleted by matching all its attributes
-                    # This is more robust than just EAN in case of duplicate EANs with different details
-                    row_to_delete_mask = (
-                        (original_df_for_deletion['CodigoEAN'] == row['CodigoEAN']) &
-                        (original_df_for_deletion['Item'] == row['Item']) &
-                        (original_df_for_deletion['DataValidade'] == row['DataValidade']) &
-                        (original_df_for_deletion['Lote'].fillna('') == row['Lote'].fillna('')) & # Handle NaN/empty strings
-                        (original_df_for_deletion['Quantidade'] == row['Quantidade']) &
-                        (original_df_for_deletion['Secao'] == row['Secao'])
-                    )
-                    
-                    # If there are multiple identical rows, this will delete all of them.
-                    # If you need to delete only one specific instance, you would need a unique row ID.
-                    df_products_updated = original_df_for_deletion[~row_to_delete_mask]
-                    
-                    salvar_produtos(df_products_updated)
+                    # Cada registro tem um ID único: exclui exatamente a linha clicada,
+                    # mesmo que existam outras idênticas, sem reescrever o CSV
+                    excluir_produto(row['ID'], row['Secao'])
                     st.success(f"Item com Código EAN '{row['CodigoEAN']}' excluído com sucesso.")
                     st.rerun()
 
@@ -350,6 +336,197 @@ def tela_cadastro_item():
         st.info("Nenhum produto cadastrado ainda.")
 
 
+# --- Alertas de Validade ---
+def tela_alertas():
+    st.title("Alertas de Validade")
+
+    col1, col2, col3 = st.columns([0.35, 0.35, 0.3])
+    with col1:
+        # Admin e Gerência escolhem a seção; os demais veem apenas a própria
+        if st.session_state.secao in ["Admin", "Gerência"]:
+            secao_alerta = st.selectbox("Seção", ["Todas"] + SECOES, key="alertas_secao")
+            if secao_alerta == "Todas":
+                secao_alerta = None
+        else:
+            secao_alerta = st.session_state.secao
+            st.markdown(f"**Seção:** {secao_alerta}")
+    with col2:
+        dias_alerta = st.number_input(
+            "Vencendo nos próximos (dias)", min_value=0, max_value=365, value=DIAS_ALERTA_PADRAO, step=1
+        )
+    with col3:
+        incluir_vencidos = st.checkbox("Incluir vencidos", value=True)
+
+    # Consulta por intervalo no índice de validade, sem percorrer a tabela inteira
+    df_alertas = produtos_a_vencer(dias_alerta, secao_alerta, incluir_vencidos)
+    if df_alertas.empty:
+        st.success("Nenhum produto vencendo no período selecionado.")
+        return
+
+    contagem = df_alertas['FaixaValidade'].value_counts()
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Vencidos", int(contagem.get('vencido', 0)))
+    m2.metric(f"Vencem em até {LIMITE_CRITICO} dias", int(contagem.get('critico', 0)))
+    m3.metric(f"Vencem em até {LIMITE_ATENCAO} dias", int(contagem.get('atencao', 0)))
+
+    df_alertas['Status'] = status_validade_texto(df_alertas['Dias Restantes'])
+    # st.dataframe só desenha as linhas visíveis, então listas longas continuam leves
+    st.dataframe(
+        df_alertas[['CodigoEAN', 'Item', 'DataValidade', 'Dias Restantes', 'Status', 'Lote', 'Quantidade', 'Secao']],
+        hide_index=True,
+        column_config={
+            'CodigoEAN': "Cód. EAN",
+            'DataValidade': st.column_config.DateColumn("Validade", format="DD/MM/YYYY"),
+            'Secao': "Seção",
+        },
+    )
+
+
+# --- Painel ---
+def tela_painel():
+    st.title("Painel de Validade")
+
+    if st.session_state.secao in ["Admin", "Gerência"]:
+        secao_painel = st.selectbox("Seção", ["Todas"] + SECOES, key="painel_secao")
+        if secao_painel == "Todas":
+            secao_painel = None
+    else:
+        secao_painel = st.session_state.secao
+        st.markdown(f"**Seção:** {secao_painel}")
+
+    # Os gráficos usam os totais por (seção, dia) já agregados, não a lista de produtos
+    st.subheader("Quantidade em Risco por Seção")
+    df_risco = quantidade_em_risco_por_secao(secao_painel)
+    if df_risco.empty:
+        st.success(f"Nenhum produto vencido ou vencendo em até {LIMITE_ATENCAO} dias.")
+    else:
+        df_risco['Faixa'] = df_risco['Faixa'].astype(str)
+        grafico = px.bar(
+            df_risco, x='Secao', y='Quantidade', color='Faixa', color_discrete_map=CORES_FAIXAS,
+            labels={'Secao': 'Seção', 'Faixa': 'Faixa de validade'},
+        )
+        st.plotly_chart(grafico)
+
+    st.subheader(f"Vencimentos por Semana (próximas {SEMANAS_PAINEL} semanas)")
+    df_semanas = vencimentos_por_semana(SEMANAS_PAINEL, secao_painel)
+    if df_semanas.empty:
+        st.info("Nenhum vencimento previsto no período.")
+    else:
+        grafico = px.bar(
+            df_semanas, x='Semana', y='Quantidade', color='Secao', hover_data=['Lotes'],
+            labels={'Semana': 'Semana (início)', 'Secao': 'Seção'},
+        )
+        st.plotly_chart(grafico)
+
+    st.subheader(f"Quantidade Vencida (últimas {SEMANAS_PAINEL} semanas)")
+    df_vencidos = vencidos_por_semana(SEMANAS_PAINEL, secao_painel)
+    if df_vencidos.empty:
+        st.success("Nenhum produto venceu no período.")
+    else:
+        grafico = px.line(
+            df_vencidos, x='Semana', y=['Quantidade', 'Quantidade Acumulada'], markers=True,
+            labels={'Semana': 'Semana (início)', 'value': 'Quantidade', 'variable': ''},
+        )
+        st.plotly_chart(grafico)
+
+    # Com o armazenamento particionado, Admin e Gerência também veem as outras lojas
+    if st.session_state.secao in ["Admin", "Gerência"] and backend_armazenamento().particiona_secoes:
+        tela_rede_lojas()
+
+
+# --- Rede de Lojas ---
+def tela_rede_lojas():
+    st.header("Rede de Lojas")
+    # Somada em paralelo a partir das partições (loja, seção); só as alteradas são relidas
+    resumo = resumo_rede()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Lojas", resumo['lojas'])
+    col2.metric("Lotes Ativos", resumo['lotes'])
+    col3.metric("Quantidade em Risco", resumo['quantidade_em_risco'])
+
+    st.subheader("Quantidade em Risco por Loja")
+    df_risco = risco_por_loja()
+    if df_risco.empty:
+        st.success(f"Nenhum produto vencido ou vencendo em até {LIMITE_ATENCAO} dias na rede.")
+    else:
+        df_risco['Faixa'] = df_risco['Faixa'].astype(str)
+        grafico = px.bar(
+            df_risco, x='Loja', y='Quantidade', color='Faixa', color_discrete_map=CORES_FAIXAS,
+            labels={'Faixa': 'Faixa de validade'},
+        )
+        st.plotly_chart(grafico)
+        st.dataframe(risco_por_loja_e_secao())
+
+    st.subheader(f"Vencimentos na Rede por Semana (próximas {SEMANAS_PAINEL} semanas)")
+    df_semanas = vencimentos_por_semana_rede(SEMANAS_PAINEL)
+    if df_semanas.empty:
+        st.info("Nenhum vencimento previsto no período.")
+    else:
+        grafico = px.bar(
+            df_semanas, x='Semana', y='Quantidade', color='Loja', hover_data=['Lotes'],
+            labels={'Semana': 'Semana (início)'},
+        )
+        st.plotly_chart(grafico)
+
+
+# --- Desempenho ---
+def tela_desempenho():
+    st.subheader("Desempenho")
+    st.caption(
+        "Tempos incluem as etapas internas (a leitura de produtos inclui a tipagem). "
+        "Etapas em cache só aparecem quando o cache é refeito."
+    )
+
+    ultima = st.session_state.get('metricas_ultima_execucao')
+    if ultima:
+        st.markdown(f"**Reexecução anterior desta sessão:** {ultima['duracao_s'] * 1000:.0f} ms")
+        df_ultima = pd.DataFrame(
+            [(etapa, chamadas, total * 1000) for etapa, (chamadas, total) in ultima['tempos'].items()],
+            columns=['Etapa', 'Chamadas', 'Tempo (ms)'],
+        ).sort_values('Tempo (ms)', ascending=False)
+        st.dataframe(df_ultima, hide_index=True, column_config={'Tempo (ms)': st.column_config.NumberColumn(format="%.1f")})
+        if ultima['contadores']:
+            st.caption(" · ".join(f"{operacao}: {total}" for operacao, total in sorted(ultima['contadores'].items())))
+
+    st.markdown("**Acumulado no processo (todas as sessões)**")
+    df_tempos = pd.DataFrame(resumo_tempos(), columns=['Etapa', 'Seção', 'Chamadas', 'Total (s)', 'Máximo (s)'])
+    if df_tempos.empty:
+        st.info("Nenhuma medição registrada ainda.")
+    else:
+        df_tempos['Seção'] = df_tempos['Seção'].replace('', '(segundo plano/sem login)')
+        secao_desempenho = st.selectbox("Seção", ["Todas"] + sorted(df_tempos['Seção'].unique()), key="desempenho_secao")
+        if secao_desempenho != "Todas":
+            df_tempos = df_tempos[df_tempos['Seção'] == secao_desempenho]
+        df_tempos['Média (ms)'] = df_tempos['Total (s)'] / df_tempos['Chamadas'] * 1000
+        df_tempos['Máximo (ms)'] = df_tempos['Máximo (s)'] * 1000
+        st.dataframe(
+            df_tempos.sort_values('Total (s)', ascending=False)[['Etapa', 'Seção', 'Chamadas', 'Total (s)', 'Média (ms)', 'Máximo (ms)']],
+            hide_index=True,
+            column_config={
+                'Total (s)': st.column_config.NumberColumn(format="%.2f"),
+                'Média (ms)': st.column_config.NumberColumn(format="%.1f"),
+                'Máximo (ms)': st.column_config.NumberColumn(format="%.1f"),
+            },
+        )
+        df_contadores = pd.DataFrame(resumo_contadores(), columns=['Operação', 'Seção', 'Total'])
+        if not df_contadores.empty:
+            df_contadores['Seção'] = df_contadores['Seção'].replace('', '(segundo plano/sem login)')
+            st.dataframe(
+                df_contadores.pivot_table(index='Operação', columns='Seção', values='Total', aggfunc='sum', fill_value=0),
+            )
+
+    col_baixar, col_zerar = st.columns(2)
+    with col_baixar:
+        # Mesmo texto do arquivo ARQUIVO_METRICAS (formato do Prometheus)
+        st.download_button(
+            "Baixar Métricas (Prometheus)", data=texto_prometheus, file_name="metricas.prom", mime="text/plain"
+        )
+    with col_zerar:
+        if st.button("Zerar Métricas"):
+            zerar_metricas()
+            st.rerun()
+
+
 # --- Área do Administrador ---
 def tela_administrador():
     st.title("Área do Administrador")
@@ -413,6 +590,38 @@ def tela_administrador():
         else:
             st.info("Não há usuários para excluir.")
 
+    st.markdown("---")
+    st.subheader("Arquivo de Lotes Vencidos")
+    st.caption(
+        f"Lotes vencidos há mais de {DIAS_ARQUIVAMENTO} dias saem da lista de produtos automaticamente "
+        "e ficam guardados aqui para auditoria."
+    )
+    if st.button("Arquivar Vencidos Agora"):
+        quantidade = arquivar_vencidos()
+        st.success(f"{quantidade} lotes arquivados.")
+    col_inicio, col_fim, col_secao = st.columns(3)
+    with col_inicio:
+        arquivo_inicio = st.date_input("Validade de", value=(datetime.now() - timedelta(days=365)).date(), format="DD/MM/YYYY")
+    with col_fim:
+        arquivo_fim = st.date_input("Validade até", value=datetime.now().date(), format="DD/MM/YYYY")
+    with col_secao:
+        arquivo_secao = st.selectbox("Seção", ["Todas"] + SECOES, key="arquivo_secao")
+    if st.button("Consultar Arquivo"):
+        df_arquivo = consultar_arquivo(arquivo_inicio, arquivo_fim, None if arquivo_secao == "Todas" else arquivo_secao)
+        if df_arquivo.empty:
+            st.info("Nenhum lote arquivado no período.")
+        else:
+            st.dataframe(
+                df_arquivo[['CodigoEAN', 'Item', 'DataValidade', 'Lote', 'Quantidade', 'Secao', 'DataArquivamento']],
+                hide_index=True,
+                column_config={
+                    'CodigoEAN': "Cód. EAN",
+                    'DataValidade': st.column_config.DateColumn("Validade", format="DD/MM/YYYY"),
+                    'Secao': "Seção",
+                    'DataArquivamento': st.column_config.DatetimeColumn("Arquivado em", format="DD/MM/YYYY HH:mm"),
+                },
+            )
+
     st.markdown("---")
     st.subheader("Salvar Modificações e Status do Sistema")
     mensagem_modificacao = st.text_area("Descreva as modificações ou informações importantes para os usuários:", value=st.session_state.status_mensagem)
@@ -435,6 +644,11 @@ def tela_administrador():
         st.success("Status e mensagem salvos com sucesso!")
         st.rerun()
 
+    # Tempos de todas as seções: só para o Admin
+    if st.session_state.secao == "Admin":
+        st.markdown("---")
+        tela_desempenho()
+
 # --- Atualização/Sobre ---
 def tela_atualizacao_sobre():
     st.title("Atualização/Sobre a Aplicação")
@@ -450,10 +664,9 @@ def tela_atualizacao_sobre():
     """)
 
     st.subheader("Atualizações e Modificações Recentes")
-    status_cor, status_mensagem = carregar_status_app()
     st.markdown(f"""
     **Mensagem do Administrador:**
-    {status_mensagem}
+    {st.session_state.status_mensagem}
     """)
 
     st.subheader("Guia de Cores para o Usuário")
@@ -467,36 +680,62 @@ def tela_atualizacao_sobre():
     """, unsafe_allow_html=True)
 
 
-# --- Aplicação Principal do Streamlit ---
-if not st.session_state.logado:
-    tela_login()
-else:
-    # Sidebar com o status da aplicação
-    st.sidebar.title("Informações do Aplicativo")
-    st.sidebar.write(f"Usuário: **{st.session_state.usuario}**")
-    st.sidebar.write(f"Seção: **{st.session_state.secao}**")
-
-    # Bolinha de status na sidebar
+# --- Status na Sidebar ---
+@st.fragment(run_every=TTL_STATUS_APP)
+def status_sidebar():
+    # Só este trecho roda a cada TTL_STATUS_APP segundos, lendo a cópia em memória: uma
+    # mudança de status chega às sessões abertas sem que o usuário interaja, e a página
+    # inteira só é reexecutada quando o status de fato mudou
+    if sincronizar_status():
+        st.rerun(scope="app")
     status_cor_exibicao = st.session_state.status_cor
     cor_map = {"verde": "green", "amarelo": "yellow", "vermelho": "red", "azul": "blue"}
-    st.sidebar.markdown(f"""
+    st.markdown(f"""
     **Status do Sistema:** <span style="color: {cor_map.get(status_cor_exibicao, 'gray')}; font-size: 20px;">●</span>
     """, unsafe_allow_html=True)
 
 
-    tab1, tab2, tab3 = st.tabs(["Cadastro de Item", "Área do Administrador", "Atualização/Sobre"])
-
-    with tab1:
-        tela_cadastro_item()
-    with tab2:
-        tela_administrador()
-    with tab3:
-        tela_atualizacao_sobre()
-
-    st.sidebar.markdown("---")
-    if st.sidebar.button("Sair"):
-        st.session_state.logado = False
-        st.session_state.usuario = None
-        st.session_state.secao = None
-        st.rerun()
-        #streamlit run app.py
+# --- Aplicação Principal do Streamlit ---
+try:
+    if not st.session_state.logado:
+        with medir('tela.login'):
+            tela_login()
+    else:
+        # Sidebar com o status da aplicação
+        st.sidebar.title("Informações do Aplicativo")
+        st.sidebar.write(f"Usuário: **{st.session_state.usuario}**")
+        st.sidebar.write(f"Seção: **{st.session_state.secao}**")
+        if backend_armazenamento().particiona_secoes:
+            st.sidebar.write(f"Loja: **{LOJA}**")
+
+        # Bolinha de status na sidebar
+        with st.sidebar:
+            status_sidebar()
+
+
+        tab1, tab2, tab3, tab4, tab5 = st.tabs(
+            ["Cadastro de Item", "Alertas", "Painel", "Área do Administrador", "Atualização/Sobre"]
+        )
+
+        # Cada aba é medida separadamente: o Streamlit executa todas a cada reexecução
+        with tab1, medir('tela.cadastro'):
+            tela_cadastro_item()
+        with tab2, medir('tela.alertas'):
+            tela_alertas()
+        with tab3, medir('tela.painel'):
+            tela_painel()
+        with tab4, medir('tela.administrador'):
+            tela_administrador()
+        with tab5, medir('tela.sobre'):
+            tela_atualizacao_sobre()
+
+        st.sidebar.markdown("---")
+        if st.sidebar.button("Sair"):
+            st.session_state.logado = False
+            st.session_state.usuario = None
+            st.session_state.secao = None
+            st.rerun()
+            #streamlit run app.py
+finally:
+    # Também quando st.rerun() interrompe o script (com uma exceção)
+    st.session_state.metricas_ultima_execucao = finalizar_execucao()
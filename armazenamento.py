@@ -0,0 +1,731 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from metricas import contar, medir
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# --- Arquivos de Dados ---
+PASTA_DADOS = 'data'
+PRODUTOS_CSV = os.path.join(PASTA_DADOS, 'produtos.csv')
+PRODUTOS_PARQUET = os.path.join(PASTA_DADOS, 'produtos.parquet')
+# Inserções ainda não compactadas no Parquet (CSV, onde só se acrescentam linhas)
+PRODUTOS_SEGMENTO = os.path.join(PASTA_DADOS, 'produtos_novos.csv')
+USUARIOS_CSV = os.path.join(PASTA_DADOS, 'usuarios.csv')
+# Trava das escritas em usuarios.csv (troca de senha no login e tela de administração)
+USUARIOS_LOCK = os.path.join(PASTA_DADOS, 'usuarios.lock')
+STATUS_APP_FILE = os.path.join(PASTA_DADOS, 'status_app.txt')
+# Arquivo de trava compartilhado por todas as sessões que escrevem nos produtos
+PRODUTOS_LOCK = os.path.join(PASTA_DADOS, 'produtos.lock')
+# IDs excluídos (lápides), um por linha; aplicados na leitura e removidos na compactação
+PRODUTOS_EXCLUIDOS = os.path.join(PASTA_DADOS, 'produtos_excluidos.txt')
+# Quantidade de lápides que dispara a compactação em segundo plano
+LIMITE_COMPACTACAO = 500
+# Tamanho do segmento de inserções (Parquet) que dispara a compactação
+LIMITE_SEGMENTO_BYTES = 5 * 1024 * 1024
+
+# Intervalo (segundos) entre releituras do status do aplicativo, para enxergar
+# alterações feitas por outros processos; as deste processo aparecem na hora
+TTL_STATUS_APP = 30
+
+# Banco usado pelo backend 'sqlite' (produtos, usuários e status do aplicativo)
+SQLITE_DB = os.path.join(PASTA_DADOS, 'controle_validade.db')
+
+# Produtos por loja e seção no backend 'particionado' (lojas/loja=<loja>/secao=<seção>/)
+# e a loja atendida por este processo
+PASTA_LOJAS = os.path.join(PASTA_DADOS, 'lojas')
+LOJA = os.environ.get('LOJA', '01')
+
+# Onde os dados ficam: 'csv' (padrão), 'parquet' (produtos colunares e tipados, requer
+# pyarrow), 'particionado' (Parquet por loja e seção, para redes com várias lojas),
+# 'sqlite' (banco embutido com índices por seção/validade e por EAN) ou 'supabase'
+# (tabelas remotas compartilhadas entre lojas; ver supabase/esquema.sql)
+BACKEND_ARMAZENAMENTO = os.environ.get('BACKEND_ARMAZENAMENTO', 'csv').lower()
+
+COLUNAS_PRODUTOS = ['ID', 'CodigoEAN', 'Item', 'DataValidade', 'Lote', 'Quantidade', 'DataRegistro', 'Secao']
+COLUNAS_TEXTO_PRODUTOS = ['ID', 'CodigoEAN', 'Item', 'Lote']
+COLUNAS_USUARIOS = ['Usuario', 'Senha', 'Secao']
+
+# Garante que a pasta 'data' existe
+if not os.path.exists(PASTA_DADOS):
+    os.makedirs(PASTA_DADOS)
+    print(f"Pasta '{PASTA_DADOS}' criada.")
+
+
+# --- Trava de Arquivo ---
+@contextmanager
+def travar_arquivo(caminho_lock, exclusiva=True):
+    # Serializa o acesso entre sessões do Streamlit (threads) e entre processos.
+    # Leitores usam trava compartilhada para nunca enxergarem uma linha pela metade.
+    with open(caminho_lock, 'a+') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusiva else fcntl.LOCK_SH)
+        else:
+            # msvcrt não tem trava compartilhada: usa sempre a exclusiva
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def escrever_csv_atomico(df, caminho):
+    # Escreve em um arquivo temporário e troca de uma vez, assim um leitor
+    # nunca encontra o CSV truncado no meio da gravação
+    contar('arquivo_escrita')
+    caminho_tmp = caminho + '.tmp'
+    df.to_csv(caminho_tmp, index=False)
+    os.replace(caminho_tmp, caminho)
+
+
+def escrever_parquet_atomico(df, caminho):
+    contar('arquivo_escrita')
+    caminho_tmp = caminho + '.tmp'
+    df.to_parquet(caminho_tmp, index=False)
+    os.replace(caminho_tmp, caminho)
+
+
+def _remover_arquivo(caminho):
+    if os.path.exists(caminho):
+        os.remove(caminho)
+
+
+# --- Produtos ---
+def novo_id_produto():
+    return uuid.uuid4().hex
+
+
+@medir('transformacao.tipar_produtos')
+def tipar_produtos(df):
+    # Esquema tipado: textos como string (EAN mantém zeros à esquerda), datas como
+    # datetime64, quantidade inteira e seção como categoria (poucos valores repetidos)
+    df = df.reindex(columns=COLUNAS_PRODUTOS)
+    for coluna in COLUNAS_TEXTO_PRODUTOS:
+        df[coluna] = df[coluna].fillna('').astype(str)
+    # CSVs antigos podem ter o EAN gravado como número ('7891000100103.0')
+    df['CodigoEAN'] = df['CodigoEAN'].str.replace(r'\.0$', '', regex=True)
+    for coluna in ('DataValidade', 'DataRegistro'):
+        # Colunas lidas do Parquet já são datas: to_datetime nelas percorre valor a valor
+        if not pd.api.types.is_datetime64_any_dtype(df[coluna]):
+            df[coluna] = pd.to_datetime(df[coluna], errors='coerce')
+    df['Quantidade'] = pd.to_numeric(df['Quantidade'], errors='coerce').fillna(0).astype('int64')
+    df['Secao'] = df['Secao'].astype('category')
+    return df
+
+
+def produtos_para_texto(df):
+    # Formato de gravação em bancos: datas em ISO ('AAAA-MM-DD'), para que a ordem do
+    # texto seja a ordem cronológica nos índices, e None no lugar de valores ausentes
+    df = tipar_produtos(df)
+    df['DataValidade'] = df['DataValidade'].dt.strftime('%Y-%m-%d')
+    df['DataRegistro'] = df['DataRegistro'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    df['Secao'] = df['Secao'].astype(object)
+    return df.astype(object).where(df.notna(), None)
+
+
+def _ler_csv_produtos(caminho):
+    contar('arquivo_leitura')
+    try:
+        return pd.read_csv(caminho, dtype={coluna: str for coluna in COLUNAS_TEXTO_PRODUTOS})
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return pd.DataFrame(columns=COLUNAS_PRODUTOS)
+
+
+def _cabecalho_csv(caminho):
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return f.readline().strip().split(',')
+
+
+def _ler_excluidos(caminho):
+    if not os.path.exists(caminho):
+        return set()
+    contar('arquivo_leitura')
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return {linha.strip() for linha in f if linha.strip()}
+
+
+def _versao_arquivo(caminho):
+    contar('arquivo_stat')
+    try:
+        info = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    return info.st_mtime_ns, info.st_size
+
+
+class ArmazenamentoArquivos:
+    # Produtos em um arquivo base (CSV ou Parquet), mais um segmento onde as inserções
+    # são acrescentadas e um arquivo de lápides com os IDs excluídos. A compactação
+    # junta tudo de volta no arquivo base. No formato CSV o próprio arquivo base
+    # recebe as inserções, então o segmento não existe. 'pasta' é PASTA_DADOS, ou a
+    # pasta de uma partição (loja, seção) no armazenamento particionado.
+
+    # Seção e ID são filtrados em memória, sobre a tabela compartilhada em cache
+    filtra_no_banco = False
+    particiona_secoes = False
+
+    def __init__(self, formato='csv', pasta=PASTA_DADOS):
+        self.formato = formato
+        self.pasta = pasta
+        self.arquivo_csv = os.path.join(pasta, os.path.basename(PRODUTOS_CSV))
+        self.arquivo_excluidos = os.path.join(pasta, os.path.basename(PRODUTOS_EXCLUIDOS))
+        self.arquivo_lock = os.path.join(pasta, os.path.basename(PRODUTOS_LOCK))
+        if formato == 'parquet':
+            self.arquivo_base = os.path.join(pasta, os.path.basename(PRODUTOS_PARQUET))
+            self.arquivo_insercoes = os.path.join(pasta, os.path.basename(PRODUTOS_SEGMENTO))
+        elif formato == 'csv':
+            self.arquivo_base = self.arquivo_csv
+            self.arquivo_insercoes = self.arquivo_csv
+        else:
+            raise ValueError(f"Formato de armazenamento desconhecido: '{formato}'")
+
+    def versao(self):
+        # Muda a cada escrita no arquivo base, no segmento ou nas lápides
+        versao_base = _versao_arquivo(self.arquivo_base)
+        if versao_base is None:
+            return None
+        return versao_base, _versao_arquivo(self.arquivo_insercoes), _versao_arquivo(self.arquivo_excluidos)
+
+    def _ler_base(self, colunas=None):
+        if self.formato == 'parquet':
+            if not os.path.exists(self.arquivo_base):
+                return pd.DataFrame(columns=COLUNAS_PRODUTOS)
+            contar('arquivo_leitura')
+            return pd.read_parquet(self.arquivo_base, columns=colunas)
+        return _ler_csv_produtos(self.arquivo_base)
+
+    def _ler_sem_trava(self, colunas=None):
+        df = self._ler_base(colunas)
+        if self.arquivo_insercoes != self.arquivo_base:
+            novos = _ler_csv_produtos(self.arquivo_insercoes)
+            if not novos.empty:
+                if colunas is not None:
+                    novos = novos[colunas]
+                if 'Secao' in df.columns:
+                    df = df.astype({'Secao': object})
+                df = pd.concat([df, novos], ignore_index=True)
+        df = tipar_produtos(df)
+        excluidos = _ler_excluidos(self.arquivo_excluidos)
+        if excluidos:
+            df = df[~df['ID'].isin(excluidos)]
+        # Uma alteração grava uma nova versão da linha; vale sempre a última
+        df = df.drop_duplicates(subset='ID', keep='last').reset_index(drop=True)
+        return df if colunas is None else df[colunas]
+
+    def _gravar_sem_trava(self, df):
+        df = tipar_produtos(df)
+        if self.formato == 'parquet':
+            escrever_parquet_atomico(df, self.arquivo_base)
+        else:
+            escrever_csv_atomico(df, self.arquivo_base)
+        # O arquivo base reescrito já é a versão final: segmento e lápides perdem o sentido
+        if self.arquivo_insercoes != self.arquivo_base:
+            _remover_arquivo(self.arquivo_insercoes)
+        _remover_arquivo(self.arquivo_excluidos)
+
+    def _precisa_migrar_csv(self):
+        # CSVs antigos não têm a coluna 'ID' (ou têm as colunas em outra ordem)
+        return os.path.exists(self.arquivo_csv) and os.path.getsize(self.arquivo_csv) > 0 \
+            and _cabecalho_csv(self.arquivo_csv) != COLUNAS_PRODUTOS
+
+    def _migrar_csv_sem_trava(self):
+        # Atribui um ID a cada linha uma única vez
+        df = _ler_csv_produtos(self.arquivo_csv)
+        if 'ID' not in df.columns:
+            df.insert(0, 'ID', None)
+        sem_id = df['ID'].isna() | (df['ID'] == '')
+        if sem_id.any():
+            df.loc[sem_id, 'ID'] = [novo_id_produto() for _ in range(sem_id.sum())]
+        escrever_csv_atomico(tipar_produtos(df), self.arquivo_csv)
+
+    def inicializar(self):
+        # Migrações únicas e criação do arquivo base vazio; retorna mensagens para o log
+        mensagens = []
+        with travar_arquivo(self.arquivo_lock):
+            if self._precisa_migrar_csv():
+                self._migrar_csv_sem_trava()
+                mensagens.append(f"Arquivo '{self.arquivo_csv}' migrado para o formato com ID.")
+            if self.formato == 'parquet' and not os.path.exists(self.arquivo_base) \
+                    and os.path.exists(self.arquivo_csv):
+                # Migração única do CSV para o Parquet, já com as exclusões aplicadas e a
+                # última versão de cada ID; o CSV e as lápides ficam guardados como backup
+                df = ArmazenamentoArquivos('csv', self.pasta)._ler_sem_trava()
+                if os.path.exists(self.arquivo_excluidos):
+                    # Cópia: a gravação abaixo remove as lápides, e só depois dela o CSV sai
+                    shutil.copy2(self.arquivo_excluidos, self.arquivo_excluidos + '.migrado')
+                self._gravar_sem_trava(df)
+                os.replace(self.arquivo_csv, self.arquivo_csv + '.migrado')
+                mensagens.append(f"Produtos migrados de '{self.arquivo_csv}' para '{self.arquivo_base}'.")
+            if not os.path.exists(self.arquivo_base) or os.path.getsize(self.arquivo_base) == 0:
+                self._gravar_sem_trava(pd.DataFrame(columns=COLUNAS_PRODUTOS))
+                mensagens.append(f"Arquivo '{self.arquivo_base}' inicializado.")
+        return mensagens
+
+    def ler_produtos(self, secao=None, validade_inicio=None, validade_fim=None, colunas=None):
+        # 'colunas' (com 'ID') limita o que é lido do Parquet; as demais ficam de fora do resultado
+        with travar_arquivo(self.arquivo_lock, exclusiva=False):
+            df = self._ler_sem_trava(colunas)
+        if secao is not None:
+            df = df[df['Secao'] == secao]
+        if validade_inicio is not None:
+            df = df[df['DataValidade'] >= pd.Timestamp(validade_inicio)]
+        if validade_fim is not None:
+            df = df[df['DataValidade'] <= pd.Timestamp(validade_fim)]
+        return df.reset_index(drop=True)
+
+    def gravar_produtos(self, df):
+        with travar_arquivo(self.arquivo_lock):
+            self._gravar_sem_trava(df)
+
+    def inserir_produtos(self, df_novos):
+        # Inserção O(1) por linha: acrescenta ao final do arquivo de inserções em vez de
+        # ler, concatenar e reescrever o arquivo inteiro
+        df_novos = df_novos.reindex(columns=COLUNAS_PRODUTOS)
+        with travar_arquivo(self.arquivo_lock):
+            versao_antes = self.versao()
+            if self.arquivo_insercoes == self.arquivo_csv and self._precisa_migrar_csv():
+                # A migração também muda os dados: os observadores reconstroem
+                self._migrar_csv_sem_trava()
+                versao_antes = None
+            arquivo_vazio = not os.path.exists(self.arquivo_insercoes) \
+                or os.path.getsize(self.arquivo_insercoes) == 0
+            contar('arquivo_escrita')
+            with open(self.arquivo_insercoes, 'a', newline='', encoding='utf-8') as f:
+                df_novos.to_csv(f, header=arquivo_vazio, index=False)
+            # Compactar quando o segmento já cresceu o bastante
+            precisa_compactar = self.arquivo_insercoes != self.arquivo_base \
+                and os.path.getsize(self.arquivo_insercoes) >= LIMITE_SEGMENTO_BYTES
+            return precisa_compactar, versao_antes, self.versao()
+
+    def excluir_produtos(self, ids):
+        # Exclusão O(1): grava apenas as lápides com os IDs, sem reescrever o arquivo base.
+        # Pede compactação quando já há lápides suficientes para valer a pena.
+        with travar_arquivo(self.arquivo_lock):
+            versao_antes = self.versao()
+            contar('arquivo_escrita')
+            with open(self.arquivo_excluidos, 'a', encoding='utf-8') as f:
+                f.writelines(f"{id_produto}\n" for id_produto in ids)
+            precisa_compactar = len(_ler_excluidos(self.arquivo_excluidos)) >= LIMITE_COMPACTACAO
+            return precisa_compactar, versao_antes, self.versao()
+
+    def compactar(self):
+        with travar_arquivo(self.arquivo_lock):
+            versao_antes = self.versao()
+            self._gravar_sem_trava(self._ler_sem_trava())
+            return False, versao_antes, self.versao()
+
+    def ler_usuarios(self):
+        return ler_usuarios_csv()
+
+    def gravar_usuarios(self, df):
+        with travar_arquivo(USUARIOS_LOCK):
+            escrever_csv_atomico(df, USUARIOS_CSV)
+
+    def atualizar_senha(self, usuario, senha_hash):
+        # Ler, alterar e regravar sob a trava: outra troca de senha ao mesmo tempo não se perde
+        with travar_arquivo(USUARIOS_LOCK):
+            df = ler_usuarios_csv()
+            df.loc[df['Usuario'] == usuario, 'Senha'] = senha_hash
+            escrever_csv_atomico(df, USUARIOS_CSV)
+
+    def versao_usuarios(self):
+        return _versao_arquivo(USUARIOS_CSV)
+
+    def ler_status_app(self):
+        return ler_status_app_arquivo()
+
+    def gravar_status_app(self, status, mensagem):
+        contar('arquivo_escrita')
+        with open(STATUS_APP_FILE, 'w') as f:
+            f.write(f"{status}\n")
+            f.write(mensagem)
+
+
+def criar_backend(nome):
+    if nome in ('csv', 'parquet'):
+        return ArmazenamentoArquivos(nome)
+    if nome == 'particionado':
+        from armazenamento_particionado import ArmazenamentoParticionado
+        return ArmazenamentoParticionado(PASTA_LOJAS, LOJA)
+    if nome == 'sqlite':
+        from armazenamento_sqlite import ArmazenamentoSQLite
+        return ArmazenamentoSQLite(SQLITE_DB)
+    if nome == 'supabase':
+        from armazenamento_supabase import ArmazenamentoSupabase
+        return ArmazenamentoSupabase()
+    raise ValueError(f"Backend de armazenamento desconhecido: '{nome}'")
+
+
+def backend_armazenamento():
+    return _backend
+
+
+def versao_produtos():
+    return _backend.versao()
+
+
+# Entradas do cache da tabela. Nos backends de arquivo cada entrada é a tabela inteira e
+# escritas de outros processos não limpam o cache: guarda só a versão atual e a anterior
+# (para reexecuções que começaram antes da escrita). Nos bancos, cada seção é uma entrada.
+ENTRADAS_CACHE_PRODUTOS = 2 if BACKEND_ARMAZENAMENTO in ('csv', 'parquet') else 32
+
+
+@st.cache_resource(max_entries=ENTRADAS_CACHE_PRODUTOS, show_spinner=False)
+@medir('armazenamento.ler_produtos')
+def _ler_produtos(versao, secao):
+    # Um DataFrame já tipado por versão dos dados (e por seção, quando o backend filtra
+    # no banco), compartilhado por todas as sessões do processo.
+    # 'versao' só entra na chave do cache: quando os dados mudam, a leitura é refeita.
+    # 'secao' é sempre passada: o cache distingue _ler_produtos(v) de _ler_produtos(v, None).
+    return _backend.ler_produtos(secao)
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+@medir('transformacao.indice_produtos')
+def _indice_produtos(versao):
+    # Índice ID -> posição da linha; a tabela hash é montada uma vez por versão
+    return pd.Index(_ler_produtos(versao, None)['ID'])
+
+
+def invalidar_cache_produtos():
+    _ler_produtos.clear()
+    _indice_produtos.clear()
+    _ler_produtos_por_validade.clear()
+
+
+@medir('armazenamento.inicializar')
+def inicializar_produtos():
+    mensagens = _backend.inicializar()
+    if mensagens:
+        invalidar_cache_produtos()
+    return mensagens
+
+
+def carregar_produtos(secao=None):
+    # secao=None traz todas as seções (Admin/Gerência)
+    versao = versao_produtos()
+    if versao is None:
+        return tipar_produtos(pd.DataFrame(columns=COLUNAS_PRODUTOS))
+    if secao is not None and not _backend.filtra_no_banco:
+        df = _ler_produtos(versao, None)
+        return df[df['Secao'] == secao].reset_index(drop=True)
+    # Cópia para que as telas possam alterar o DataFrame sem afetar as outras sessões
+    return _ler_produtos(versao, secao).copy()
+
+
+def obter_produto(id_produto, secao=None):
+    # Busca O(1) pelo ID; retorna None se o produto não existe (ou foi excluído).
+    # 'secao', se conhecida, evita que o particionado procure nas outras partições.
+    if _backend.particiona_secoes:
+        return _backend.buscar_produto(id_produto, secao)
+    if _backend.filtra_no_banco:
+        return _backend.buscar_produto(id_produto)
+    versao = versao_produtos()
+    if versao is None:
+        return None
+    indice = _indice_produtos(versao)
+    if id_produto not in indice:
+        return None
+    return _ler_produtos(versao, None).iloc[indice.get_loc(id_produto)].to_dict()
+
+
+def carregar_produtos_por_ids(ids):
+    # Linhas dos IDs pedidos (na mesma ordem), pelo índice em cache; IDs inexistentes são ignorados
+    versao = versao_produtos()
+    if versao is None or not len(ids):
+        return tipar_produtos(pd.DataFrame(columns=COLUNAS_PRODUTOS))
+    posicoes = _indice_produtos(versao).get_indexer(ids)
+    return _ler_produtos(versao, None).iloc[posicoes[posicoes >= 0]].reset_index(drop=True)
+
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+@medir('armazenamento.ler_produtos_por_validade')
+def _ler_produtos_por_validade(versao, secao, validade_inicio, validade_fim):
+    return _backend.ler_produtos(secao, validade_inicio=validade_inicio, validade_fim=validade_fim)
+
+
+def carregar_produtos_por_validade(validade_inicio=None, validade_fim=None, secao=None):
+    # Consulta por intervalo de validade feita pelo banco (SQLite/Supabase), usando o
+    # índice (Secao, DataValidade); os backends de arquivo usam o índice de alertas.py
+    return _ler_produtos_por_validade(versao_produtos(), secao, validade_inicio, validade_fim).copy()
+
+
+# --- Observadores de Escrita ---
+# Estruturas em memória (como o índice de alertas) podem se atualizar de forma incremental
+# a cada escrita feita por este processo, em vez de serem reconstruídas do zero.
+# Cada observador recebe (evento, dados, versao_antes, versao_depois, anteriores), onde
+# evento é 'inserir' (DataFrame tipado), 'excluir' (lista de IDs) ou 'compactar' (None)
+# e 'anteriores' traz as linhas substituídas ou excluídas pela escrita (tipadas).
+# As versões vêm do próprio backend, lidas dentro da trava (ou transação) da escrita:
+# versao_antes é exatamente a versão sobre a qual a escrita foi aplicada, ou None
+# quando o backend não garante isso (aí quem observa reconstrói). Todo backend devolve
+# (precisa_compactar, versao_antes, versao_depois) em inserir_produtos,
+# excluir_produtos e compactar.
+_observadores = []
+
+
+def registrar_observador(funcao):
+    if funcao not in _observadores:
+        _observadores.append(funcao)
+
+
+def _apos_escrita(evento, dados, escrita, anteriores=None):
+    precisa_compactar, versao_antes, versao_depois = escrita
+    invalidar_cache_produtos()
+    if anteriores is None:
+        anteriores = tipar_produtos(pd.DataFrame(columns=COLUNAS_PRODUTOS))
+    with medir('observadores'):
+        for observador in _observadores:
+            observador(evento, dados, versao_antes, versao_depois, anteriores)
+    if precisa_compactar:
+        compactar_em_segundo_plano()
+
+
+@medir('armazenamento.salvar_produtos')
+def salvar_produtos(df):
+    # Reescrita completa: usada apenas para inicialização e compactação
+    _backend.gravar_produtos(df)
+    invalidar_cache_produtos()
+
+
+def _preparar_para_gravacao(produto):
+    produto = dict(produto)
+    if not produto.get('ID'):
+        produto['ID'] = novo_id_produto()
+    for coluna, formato in (('DataValidade', '%Y-%m-%d'), ('DataRegistro', '%Y-%m-%d %H:%M:%S')):
+        if isinstance(produto.get(coluna), pd.Timestamp):
+            produto[coluna] = produto[coluna].strftime(formato)
+    return produto
+
+
+@medir('armazenamento.inserir')
+def _inserir(df_novos, anteriores=None, exclusao=None):
+    precisa_compactar, versao_antes, versao_depois = _backend.inserir_produtos(df_novos)
+    if exclusao is not None:
+        # A exclusão na partição antiga e a inserção na nova são uma única alteração para
+        # quem observa, desde que nenhuma outra escrita tenha caído entre as duas
+        precisa_compactar |= exclusao[0]
+        versao_antes = exclusao[1] if exclusao[2] == versao_antes else None
+    _apos_escrita('inserir', tipar_produtos(df_novos), (precisa_compactar, versao_antes, versao_depois), anteriores)
+
+
+def adicionar_produto(produto):
+    produto = _preparar_para_gravacao(produto)
+    _inserir(pd.DataFrame([produto], columns=COLUNAS_PRODUTOS))
+    return produto['ID']
+
+
+def adicionar_produtos(df):
+    # Inserção em lote (importação): todas as linhas em uma única escrita
+    df = df.reindex(columns=COLUNAS_PRODUTOS).astype({'ID': object, 'DataRegistro': object})
+    sem_id = df['ID'].isna() | (df['ID'] == '')
+    df.loc[sem_id, 'ID'] = [novo_id_produto() for _ in range(sem_id.sum())]
+    df['DataRegistro'] = df['DataRegistro'].fillna(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    _inserir(produtos_para_texto(df))
+    return df['ID'].tolist()
+
+
+def atualizar_produto(id_produto, **alteracoes):
+    # Grava uma nova versão da linha com o mesmo ID (a leitura mantém a última)
+    produto = obter_produto(id_produto)
+    if produto is None:
+        return False
+    anterior = tipar_produtos(pd.DataFrame([produto], columns=COLUNAS_PRODUTOS))
+    secao_anterior = produto['Secao']
+    produto.update(alteracoes)
+    exclusao = None
+    if _backend.particiona_secoes and produto['Secao'] != secao_anterior:
+        # A nova versão vai para a partição da nova seção; a antiga sai da partição antiga
+        exclusao = _backend.excluir_produtos([id_produto], [secao_anterior])
+    _inserir(pd.DataFrame([_preparar_para_gravacao(produto)], columns=COLUNAS_PRODUTOS), anterior, exclusao)
+    return True
+
+
+_compactacao_em_andamento = threading.Lock()
+
+
+def compactar_produtos():
+    # Reescreve o arquivo base sem as linhas excluídas nem as versões antigas
+    if not _compactacao_em_andamento.acquire(blocking=False):
+        return
+    try:
+        with medir('armazenamento.compactar'):
+            _apos_escrita('compactar', None, _backend.compactar())
+    finally:
+        _compactacao_em_andamento.release()
+
+
+def compactar_em_segundo_plano():
+    threading.Thread(target=compactar_produtos, daemon=True).start()
+
+
+def _excluir_no_backend(ids, anteriores, secoes=None):
+    if _backend.particiona_secoes:
+        # O particionado grava a lápide só na partição da seção de cada ID: a da linha
+        # excluída ou, se ela não foi encontrada, a informada por quem chama
+        secoes = secoes or [None] * len(ids)
+        conhecidas = dict(zip(anteriores['ID'], anteriores['Secao'].astype(object)))
+        return _backend.excluir_produtos(
+            ids, [conhecidas.get(id_produto, secao) for id_produto, secao in zip(ids, secoes)],
+        )
+    return _backend.excluir_produtos(ids)
+
+
+@medir('armazenamento.excluir')
+def excluir_produto(id_produto, secao=None):
+    # 'secao': a seção do produto, quando a tela já a tem (o particionado lê só ela)
+    produto = obter_produto(id_produto, secao)
+    anterior = tipar_produtos(pd.DataFrame([produto] if produto is not None else [], columns=COLUNAS_PRODUTOS))
+    escrita = _excluir_no_backend([id_produto], anterior, [secao])
+    _apos_escrita('excluir', [id_produto], escrita, anterior)
+
+
+@medir('armazenamento.excluir')
+def excluir_produtos(ids, anteriores=None):
+    # Exclusão em lote (arquivamento): todos os IDs em uma única escrita. 'anteriores'
+    # são as linhas excluídas, quando quem chama já as tem (evita buscá-las de novo).
+    ids = list(ids)
+    if not ids:
+        return
+    if anteriores is None:
+        anteriores = carregar_produtos_por_ids(ids)
+    _apos_escrita('excluir', ids, _excluir_no_backend(ids, anteriores), anteriores)
+
+
+# --- Usuários ---
+def ler_usuarios_csv():
+    if os.path.exists(USUARIOS_CSV):
+        contar('arquivo_leitura')
+        try:
+            return pd.read_csv(USUARIOS_CSV)
+        except pd.errors.EmptyDataError:
+            return pd.DataFrame(columns=COLUNAS_USUARIOS)
+    return pd.DataFrame(columns=COLUNAS_USUARIOS)
+
+
+@medir('armazenamento.ler_usuarios')
+def carregar_usuarios():
+    return _backend.ler_usuarios()
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+@medir('armazenamento.indice_usuarios')
+def _indice_usuarios(versao):
+    # Usuario -> (hash da senha, seção): o login é uma busca no dicionário, sem ler a
+    # tabela de usuários a cada tentativa. 'versao' é a do backend (mtime e tamanho de
+    # usuarios.csv, contador no SQLite, janela de tempo no Supabase), de modo que escritas
+    # de outros processos também trocam o índice; as deste processo o limpam na hora.
+    df = _backend.ler_usuarios()
+    return {
+        str(usuario): (str(senha), secao)
+        for usuario, senha, secao in zip(df['Usuario'], df['Senha'], df['Secao'])
+    }
+
+
+def obter_usuario(usuario):
+    # Retorna (hash da senha, seção) do usuário, ou None se não existir
+    return _indice_usuarios(_backend.versao_usuarios()).get(usuario)
+
+
+@medir('armazenamento.salvar_usuarios')
+def salvar_usuarios(df):
+    _backend.gravar_usuarios(df)
+    _indice_usuarios.clear()
+
+
+def atualizar_senha_usuario(usuario, senha_hash):
+    # Atômica no backend (trava de arquivo ou UPDATE de uma linha)
+    _backend.atualizar_senha(usuario, senha_hash)
+    _indice_usuarios.clear()
+
+
+# --- Status do Aplicativo ---
+def ler_status_app_arquivo():
+    if os.path.exists(STATUS_APP_FILE):
+        contar('arquivo_leitura')
+        with open(STATUS_APP_FILE, 'r') as f:
+            lines = f.readlines()
+            if len(lines) == 2:
+                return lines[0].strip(), lines[1].strip() # Retorna (status, mensagem)
+    return None
+
+
+@medir('armazenamento.ler_status')
+def carregar_status_app():
+    return _backend.ler_status_app() or ("azul", "Tudo operando") # Padrão
+
+
+def importar_arquivos_locais(destino):
+    # Importação única dos arquivos locais (produtos em CSV/Parquet, usuarios.csv e o
+    # arquivo de status) para um backend de banco de dados (SQLite ou Supabase)
+    mensagens = []
+    arquivos = ArmazenamentoArquivos('parquet' if os.path.exists(PRODUTOS_PARQUET) else 'csv')
+    if os.path.exists(arquivos.arquivo_base) and destino.contar_produtos() == 0:
+        arquivos.inicializar()
+        df = arquivos.ler_produtos()
+        if not df.empty:
+            destino.inserir_produtos(df)
+            mensagens.append(f"{len(df)} produtos importados de '{arquivos.arquivo_base}'.")
+    df_usuarios = ler_usuarios_csv()
+    if not df_usuarios.empty and destino.ler_usuarios().empty:
+        destino.gravar_usuarios(df_usuarios)
+        mensagens.append(f"{len(df_usuarios)} usuários importados de '{USUARIOS_CSV}'.")
+    status = ler_status_app_arquivo()
+    if status is not None and destino.ler_status_app() is None:
+        destino.gravar_status_app(*status)
+    return mensagens
+
+
+@medir('armazenamento.ler_status')
+def existe_status_app():
+    return _backend.ler_status_app() is not None
+
+
+@medir('armazenamento.salvar_status')
+def salvar_status_app(status, mensagem):
+    _backend.gravar_status_app(status, mensagem)
+    with _trava_status:
+        _atualizar_status_em_memoria((status, mensagem))
+
+
+# Cópia em memória do status, compartilhada pelas sessões do processo: as reexecuções
+# não leem o disco (nem o banco) para mostrar o status. 'versao' muda a cada alteração
+# vista por este processo; cada sessão guarda a última versão que exibiu.
+_trava_status = threading.Lock()
+_status_app = {'valor': None, 'versao': 0, 'lido_em': 0.0}
+
+
+def _atualizar_status_em_memoria(valor):
+    if valor != _status_app['valor']:
+        _status_app['valor'] = valor
+        _status_app['versao'] += 1
+    _status_app['lido_em'] = time.monotonic()
+
+
+def status_app():
+    # Retorna (status, mensagem, versao), relendo o backend no máximo a cada TTL_STATUS_APP segundos
+    with _trava_status:
+        if _status_app['valor'] is None or time.monotonic() - _status_app['lido_em'] > TTL_STATUS_APP:
+            _atualizar_status_em_memoria(carregar_status_app())
+        return (*_status_app['valor'], _status_app['versao'])
+
+
+# Criado por último: o backend SQLite importa funções definidas acima neste módulo
+_backend = criar_backend(BACKEND_ARMAZENAMENTO)
@@ -0,0 +1,243 @@
+import os
+import threading
+from collections import defaultdict
+from urllib.parse import quote, unquote
+
+import pandas as pd
+
+from armazenamento import (
+    COLUNAS_PRODUTOS, PRODUTOS_CSV, PRODUTOS_PARQUET, ArmazenamentoArquivos, tipar_produtos, travar_arquivo,
+)
+from metricas import contar
+
+
+def pasta_loja(pasta_lojas, loja):
+    # Nomes de loja e seção vão codificados ('DOCES/BOMBOM' -> 'DOCES%2FBOMBOM')
+    return os.path.join(pasta_lojas, f"loja={quote(str(loja), safe='')}")
+
+
+def pasta_particao(pasta_lojas, loja, secao):
+    return os.path.join(pasta_loja(pasta_lojas, loja), f"secao={quote(str(secao), safe='')}")
+
+
+def _subpastas(pasta, prefixo):
+    # (valor decodificado, caminho) das subpastas 'prefixo=valor'
+    if not os.path.isdir(pasta):
+        return []
+    return [
+        (unquote(nome[len(prefixo) + 1:]), os.path.join(pasta, nome))
+        for nome in sorted(os.listdir(pasta))
+        if nome.startswith(f'{prefixo}=') and os.path.isdir(os.path.join(pasta, nome))
+    ]
+
+
+def listar_particoes(pasta_lojas):
+    # (loja, seção, pasta) de todas as partições em disco, de todas as lojas
+    return [
+        (loja, secao, pasta)
+        for loja, caminho_loja in _subpastas(pasta_lojas, 'loja')
+        for secao, pasta in _subpastas(caminho_loja, 'secao')
+    ]
+
+
+def _secao_da_linha(secao):
+    # Linhas sem seção ficam na partição 'secao=' (vazia)
+    return '' if pd.isna(secao) else str(secao)
+
+
+class ArmazenamentoParticionado:
+    # Produtos de cada (loja, seção) em uma pasta própria, lojas/loja=<loja>/secao=<seção>/,
+    # cada uma no formato do backend 'parquet' (arquivo base, segmento de inserções e
+    # lápides, com trava própria). O processo atende uma loja: um usuário de seção lê só a
+    # partição da sua seção, e escritas em seções diferentes não disputam a mesma trava.
+    # A visão consolidada da rede (consolidacao.py) lê as partições de todas as lojas.
+
+    # A seção escolhe a partição: o filtro por seção não lê as outras
+    filtra_no_banco = True
+    # Exclusões precisam da seção de cada ID (a lápide vai para a partição dele)
+    particiona_secoes = True
+
+    def __init__(self, pasta_lojas, loja):
+        self.pasta_lojas = pasta_lojas
+        self.loja = loja
+        self.pasta = pasta_loja(pasta_lojas, loja)
+        # Regravado a cada escrita em qualquer seção da loja; seu mtime é a versão dos caches
+        self.arquivo_versao = os.path.join(self.pasta, 'versao.txt')
+        self.arquivo_lock = os.path.join(self.pasta, 'versao.lock')
+        self._trava = threading.Lock()
+        self._particoes = {}
+        # Usuários e status do aplicativo continuam nos arquivos de PASTA_DADOS, comuns à rede
+        self._arquivos = ArmazenamentoArquivos('csv')
+
+    def _particao(self, secao):
+        with self._trava:
+            if secao not in self._particoes:
+                pasta = pasta_particao(self.pasta_lojas, self.loja, secao)
+                os.makedirs(pasta, exist_ok=True)
+                particao = ArmazenamentoArquivos('parquet', pasta)
+                # O arquivo base vazio dá versão à partição desde a primeira inserção
+                particao.inicializar()
+                self._particoes[secao] = particao
+            return self._particoes[secao]
+
+    def _secoes(self):
+        # Seções com partição em disco, inclusive as criadas por outros processos
+        return [secao for secao, _ in _subpastas(self.pasta, 'secao')]
+
+    def _tocar_versao_sem_trava(self):
+        # Um contador garante que o conteúdo (e o mtime) mude a cada escrita; retorna o novo valor
+        try:
+            with open(self.arquivo_versao, 'r', encoding='utf-8') as f:
+                contador = int(f.read() or 0)
+        except (FileNotFoundError, ValueError):
+            contador = 0
+        contar('arquivo_escrita')
+        with open(self.arquivo_versao, 'w', encoding='utf-8') as f:
+            f.write(str(contador + 1))
+        return contador + 1
+
+    def _iniciar_escrita(self):
+        # A versão muda antes da escrita nas partições (quem ler dados pela metade não os
+        # guarda com a versão antiga) e de novo depois (em _concluir_escrita). Retorna a
+        # versão sobre a qual a escrita é aplicada e o contador após o primeiro passo.
+        with travar_arquivo(self.arquivo_lock):
+            versao_antes = self.versao()
+            return versao_antes, self._tocar_versao_sem_trava()
+
+    def _concluir_escrita(self, versao_antes, contador):
+        # (versao_antes, versao_depois) para os observadores. Se outra escrita da loja
+        # mexeu no contador no meio, versao_antes vira None: quem observa reconstrói.
+        with travar_arquivo(self.arquivo_lock):
+            sozinha = self._tocar_versao_sem_trava() == contador + 1
+            return (versao_antes if sozinha else None), self.versao()
+
+    def versao(self):
+        contar('arquivo_stat')
+        try:
+            info = os.stat(self.arquivo_versao)
+        except FileNotFoundError:
+            return None
+        return info.st_mtime_ns, info.st_size
+
+    def inicializar(self):
+        # Cria a pasta da loja e, uma única vez, divide por seção os produtos do formato
+        # antigo (um arquivo só em PASTA_DADOS), que fica guardado como backup
+        mensagens = []
+        os.makedirs(self.pasta, exist_ok=True)
+        with travar_arquivo(self.arquivo_lock):
+            if not self._secoes():
+                for formato, caminho in (('parquet', PRODUTOS_PARQUET), ('csv', PRODUTOS_CSV)):
+                    if not os.path.exists(caminho) or os.path.getsize(caminho) == 0:
+                        continue
+                    antigo = ArmazenamentoArquivos(formato)
+                    mensagens += antigo.inicializar()
+                    df = antigo.ler_produtos()
+                    for secao, grupo in df.groupby(df['Secao'].astype(object).map(_secao_da_linha), sort=False):
+                        self._particao(secao).gravar_produtos(grupo)
+                    for arquivo in {antigo.arquivo_base, antigo.arquivo_insercoes, antigo.arquivo_excluidos}:
+                        if os.path.exists(arquivo):
+                            os.replace(arquivo, arquivo + '.migrado')
+                    mensagens.append(f"{len(df)} produtos de '{caminho}' divididos por seção em '{self.pasta}'.")
+                    break
+            if mensagens or not os.path.exists(self.arquivo_versao):
+                self._tocar_versao_sem_trava()
+        return mensagens
+
+    # --- Produtos ---
+    def ler_produtos(self, secao=None, validade_inicio=None, validade_fim=None):
+        secoes = [secao] if secao is not None else self._secoes()
+        partes = [
+            self._particao(s).ler_produtos(validade_inicio=validade_inicio, validade_fim=validade_fim)
+            for s in secoes
+        ]
+        partes = [parte for parte in partes if not parte.empty]
+        if not partes:
+            return tipar_produtos(pd.DataFrame(columns=COLUNAS_PRODUTOS))
+        df = pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+        df['Secao'] = df['Secao'].astype(object).astype('category')
+        if validade_inicio is not None or validade_fim is not None:
+            # Consultas por intervalo saem ordenadas por validade, como nos bancos
+            df = df.sort_values('DataValidade', kind='stable').reset_index(drop=True)
+        return df
+
+    def buscar_produto(self, id_produto, secao=None):
+        # Com a seção, só a partição dela é lida. Sem ela (ou se o lote mudou de seção
+        # nesse meio-tempo), procura partição por partição lendo só a coluna ID.
+        secoes = self._secoes()
+        if secao is not None and _secao_da_linha(secao) in secoes:
+            secao = _secao_da_linha(secao)
+            df = self._particao(secao).ler_produtos()
+            encontrados = df[df['ID'] == id_produto]
+            if not encontrados.empty:
+                return encontrados.iloc[-1].to_dict()
+            secoes.remove(secao)
+        for secao in secoes:
+            particao = self._particao(secao)
+            if (particao.ler_produtos(colunas=['ID'])['ID'] == id_produto).any():
+                df = particao.ler_produtos()
+                return df[df['ID'] == id_produto].iloc[-1].to_dict()
+        return None
+
+    def gravar_produtos(self, df):
+        df = tipar_produtos(df)
+        grupos = dict(tuple(df.groupby(df['Secao'].astype(object).map(_secao_da_linha), sort=False)))
+        inicio = self._iniciar_escrita()
+        # Seções que não aparecem em 'df' ficam vazias
+        for secao in set(self._secoes()) | set(grupos):
+            self._particao(secao).gravar_produtos(grupos.get(secao, df.iloc[:0]))
+        self._concluir_escrita(*inicio)
+
+    def inserir_produtos(self, df_novos):
+        precisa_compactar = False
+        inicio = self._iniciar_escrita()
+        for secao, grupo in df_novos.groupby(df_novos['Secao'].map(_secao_da_linha), sort=False):
+            precisa_compactar |= self._particao(secao).inserir_produtos(grupo)[0]
+        return (precisa_compactar, *self._concluir_escrita(*inicio))
+
+    def excluir_produtos(self, ids, secoes=None):
+        # 'secoes': seção de cada ID, na mesma ordem (None quando desconhecida). Sem ela, a
+        # lápide vai para todas as partições da loja; IDs são únicos, então é inofensivo.
+        secoes = list(secoes) if secoes is not None else [None] * len(ids)
+        por_secao = defaultdict(list)
+        desconhecidos = []
+        for id_produto, secao in zip(ids, secoes):
+            if secao is None:
+                desconhecidos.append(id_produto)
+            else:
+                por_secao[_secao_da_linha(secao)].append(id_produto)
+        if desconhecidos:
+            for secao in self._secoes():
+                por_secao[secao].extend(desconhecidos)
+        precisa_compactar = False
+        inicio = self._iniciar_escrita()
+        for secao, ids_secao in por_secao.items():
+            precisa_compactar |= self._particao(secao).excluir_produtos(ids_secao)[0]
+        return (precisa_compactar, *self._concluir_escrita(*inicio))
+
+    def compactar(self):
+        # Só as partições com inserções ou lápides pendentes são reescritas
+        inicio = self._iniciar_escrita()
+        for secao in self._secoes():
+            particao = self._particao(secao)
+            if os.path.exists(particao.arquivo_insercoes) or os.path.exists(particao.arquivo_excluidos):
+                particao.compactar()
+        return (False, *self._concluir_escrita(*inicio))
+
+    # --- Usuários e Status ---
+    def ler_usuarios(self):
+        return self._arquivos.ler_usuarios()
+
+    def gravar_usuarios(self, df):
+        self._arquivos.gravar_usuarios(df)
+
+    def atualizar_senha(self, usuario, senha_hash):
+        self._arquivos.atualizar_senha(usuario, senha_hash)
+
+    def versao_usuarios(self):
+        return self._arquivos.versao_usuarios()
+
+    def ler_status_app(self):
+        return self._arquivos.ler_status_app()
+
+    def gravar_status_app(self, status, mensagem):
+        self._arquivos.gravar_status_app(status, mensagem)
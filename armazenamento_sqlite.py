@@ -0,0 +1,192 @@
+import sqlite3
+import threading
+
+import pandas as pd
+
+from armazenamento import (
+    COLUNAS_PRODUTOS, COLUNAS_USUARIOS, importar_arquivos_locais, produtos_para_texto, tipar_produtos,
+)
+from metricas import contar
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS produtos (
+    ID TEXT PRIMARY KEY,
+    CodigoEAN TEXT NOT NULL,
+    Item TEXT NOT NULL,
+    DataValidade TEXT,
+    Lote TEXT,
+    Quantidade INTEGER,
+    DataRegistro TEXT,
+    Secao TEXT
+);
+-- Lista de uma seção ordenada por validade vira uma varredura de intervalo no índice
+CREATE INDEX IF NOT EXISTS idx_produtos_secao_validade ON produtos (Secao, DataValidade);
+CREATE INDEX IF NOT EXISTS idx_produtos_ean ON produtos (CodigoEAN);
+
+CREATE TABLE IF NOT EXISTS usuarios (
+    Usuario TEXT PRIMARY KEY,
+    Senha TEXT NOT NULL,
+    Secao TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS status_app (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    status TEXT NOT NULL,
+    mensagem TEXT NOT NULL
+);
+
+-- 'versao' é incrementada a cada escrita nos produtos e serve de chave para os caches;
+-- 'versao_usuarios', a cada escrita nos usuários
+CREATE TABLE IF NOT EXISTS meta (
+    chave TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (chave, valor) VALUES ('versao', 0);
+INSERT OR IGNORE INTO meta (chave, valor) VALUES ('versao_usuarios', 0);
+"""
+
+_INCREMENTAR_VERSAO_USUARIOS = "UPDATE meta SET valor = valor + 1 WHERE chave = 'versao_usuarios'"
+
+
+class ArmazenamentoSQLite:
+    # Produtos, usuários e status em um banco SQLite no modo WAL (leitores não bloqueiam
+    # o escritor). Uma única conexão por processo é reaproveitada por todas as sessões.
+
+    # Seção e ID são filtrados pelo banco, usando os índices
+    filtra_no_banco = True
+    particiona_secoes = False
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._trava = threading.RLock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False, timeout=30)
+        with self._trava:
+            self._conexao.execute('PRAGMA journal_mode=WAL')
+            self._conexao.execute('PRAGMA synchronous=NORMAL')
+            self._conexao.executescript(ESQUEMA)
+
+    def _consultar(self, sql, parametros=()):
+        contar('banco_leitura')
+        with self._trava:
+            return self._conexao.execute(sql, parametros).fetchall()
+
+    def _ler_sql(self, sql, parametros=()):
+        contar('banco_leitura')
+        with self._trava:
+            return pd.read_sql_query(sql, self._conexao, params=parametros)
+
+    def _escrever(self, comandos, versionar=True):
+        # Executa as escritas em uma transação e, se mexem nos produtos, incrementa a versão
+        # deles. Usuários e status têm a própria invalidação e não tocam os caches de produtos.
+        # Retorna (versao_antes, versao_depois), lidas na mesma transação: nenhuma outra
+        # escrita cabe entre as duas.
+        contar('banco_escrita')
+        with self._trava, self._conexao:
+            for sql, parametros in comandos:
+                if isinstance(parametros, list):
+                    self._conexao.executemany(sql, parametros)
+                else:
+                    self._conexao.execute(sql, parametros)
+            if versionar:
+                self._conexao.execute("UPDATE meta SET valor = valor + 1 WHERE chave = 'versao'")
+                versao_depois = self._conexao.execute("SELECT valor FROM meta WHERE chave = 'versao'").fetchone()[0]
+                return versao_depois - 1, versao_depois
+
+    def versao(self):
+        return self._consultar("SELECT valor FROM meta WHERE chave = 'versao'")[0][0]
+
+    def contar_produtos(self):
+        return self._consultar("SELECT COUNT(*) FROM produtos")[0][0]
+
+    def _migrado(self):
+        return bool(self._consultar("SELECT 1 FROM meta WHERE chave = 'migrado'"))
+
+    def inicializar(self):
+        # Importa uma única vez os dados dos arquivos CSV/Parquet existentes
+        if self._migrado():
+            return []
+        mensagens = importar_arquivos_locais(self)
+        self._escrever([("INSERT OR IGNORE INTO meta (chave, valor) VALUES ('migrado', 1)", ())], versionar=False)
+        return mensagens
+
+    # --- Produtos ---
+    def ler_produtos(self, secao=None, validade_inicio=None, validade_fim=None):
+        condicoes, parametros = [], []
+        if secao is not None:
+            condicoes.append("Secao = ?")
+            parametros.append(secao)
+        if validade_inicio is not None:
+            condicoes.append("DataValidade >= ?")
+            parametros.append(pd.Timestamp(validade_inicio).strftime('%Y-%m-%d'))
+        if validade_fim is not None:
+            condicoes.append("DataValidade <= ?")
+            parametros.append(pd.Timestamp(validade_fim).strftime('%Y-%m-%d'))
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        df = self._ler_sql(
+            f"SELECT {', '.join(COLUNAS_PRODUTOS)} FROM produtos {where} ORDER BY DataValidade",
+            tuple(parametros),
+        )
+        return tipar_produtos(df)
+
+    def buscar_produto(self, id_produto):
+        colunas = ', '.join(COLUNAS_PRODUTOS)
+        df = self._ler_sql(f"SELECT {colunas} FROM produtos WHERE ID = ?", (id_produto,))
+        if df.empty:
+            return None
+        return tipar_produtos(df).iloc[0].to_dict()
+
+    def gravar_produtos(self, df):
+        linhas = list(produtos_para_texto(df).itertuples(index=False, name=None))
+        marcadores = ', '.join('?' * len(COLUNAS_PRODUTOS))
+        self._escrever([
+            ("DELETE FROM produtos", ()),
+            (f"INSERT INTO produtos ({', '.join(COLUNAS_PRODUTOS)}) VALUES ({marcadores})", linhas),
+        ])
+
+    def inserir_produtos(self, df_novos):
+        # INSERT OR REPLACE: uma alteração regrava a linha com o mesmo ID
+        linhas = list(produtos_para_texto(df_novos).itertuples(index=False, name=None))
+        marcadores = ', '.join('?' * len(COLUNAS_PRODUTOS))
+        return (False, *self._escrever([
+            (f"INSERT OR REPLACE INTO produtos ({', '.join(COLUNAS_PRODUTOS)}) VALUES ({marcadores})", linhas),
+        ]))
+
+    def excluir_produtos(self, ids):
+        return (False, *self._escrever([("DELETE FROM produtos WHERE ID = ?", [(id_produto,) for id_produto in ids])]))
+
+    def compactar(self):
+        # Exclusões já são definitivas no banco; não há lápides a compactar nem versão nova
+        versao = self.versao()
+        return False, versao, versao
+
+    # --- Usuários ---
+    def ler_usuarios(self):
+        return self._ler_sql(f"SELECT {', '.join(COLUNAS_USUARIOS)} FROM usuarios")
+
+    def gravar_usuarios(self, df):
+        linhas = list(df[COLUNAS_USUARIOS].itertuples(index=False, name=None))
+        self._escrever([
+            ("DELETE FROM usuarios", ()),
+            ("INSERT INTO usuarios (Usuario, Senha, Secao) VALUES (?, ?, ?)", linhas),
+            (_INCREMENTAR_VERSAO_USUARIOS, ()),
+        ], versionar=False)
+
+    def atualizar_senha(self, usuario, senha_hash):
+        # Só a linha do usuário, em uma transação: nada de ler e regravar a tabela
+        self._escrever([
+            ("UPDATE usuarios SET Senha = ? WHERE Usuario = ?", (senha_hash, usuario)),
+            (_INCREMENTAR_VERSAO_USUARIOS, ()),
+        ], versionar=False)
+
+    def versao_usuarios(self):
+        return self._consultar("SELECT valor FROM meta WHERE chave = 'versao_usuarios'")[0][0]
+
+    # --- Status do Aplicativo ---
+    def ler_status_app(self):
+        linhas = self._consultar("SELECT status, mensagem FROM status_app WHERE id = 1")
+        return tuple(linhas[0]) if linhas else None
+
+    def gravar_status_app(self, status, mensagem):
+        self._escrever([(
+            "INSERT OR REPLACE INTO status_app (id, status, mensagem) VALUES (1, ?, ?)", (status, mensagem)
+        )], versionar=False)
@@ -0,0 +1,192 @@
+import os
+import time
+
+import pandas as pd
+from dotenv import load_dotenv
+from postgrest import SyncPostgrestClient
+from postgrest.types import CountMethod, ReturnMethod
+from supabase import create_client
+
+from armazenamento import (
+    COLUNAS_PRODUTOS, COLUNAS_USUARIOS, importar_arquivos_locais, produtos_para_texto, tipar_produtos,
+)
+from metricas import contar
+
+SUPABASE_ENV = 'supabase.env'
+# Linhas por requisição de escrita (inserções e exclusões vão em lotes)
+TAMANHO_LOTE = 500
+# Limite padrão de linhas por resposta do PostgREST; leituras maiores são paginadas
+TAMANHO_PAGINA = 1000
+# Por quantos segundos a versão remota é reaproveitada antes de consultar o servidor de novo
+TTL_VERSAO = 5
+# Por quantos segundos o índice de usuários é reaproveitado: alterações feitas por outros
+# processos (senhas, usuários novos) aparecem depois disso; as deste processo, na hora
+TTL_USUARIOS = 30
+
+
+def _lotes(itens, tamanho=TAMANHO_LOTE):
+    for inicio in range(0, len(itens), tamanho):
+        yield itens[inicio:inicio + tamanho]
+
+
+def _data_iso(data):
+    return pd.Timestamp(data).strftime('%Y-%m-%d')
+
+
+def criar_cliente():
+    # SUPABASE_URL pode ser a URL do projeto ou só a referência (como em supabase.env).
+    # SUPABASE_REST_URL aponta direto para um PostgREST (ex.: um Postgres local de testes).
+    load_dotenv(SUPABASE_ENV)
+    chave = os.environ.get('SUPABASE_KEY', '')
+    url_rest = os.environ.get('SUPABASE_REST_URL')
+    if url_rest:
+        cabecalhos = {'apikey': chave, 'Authorization': f'Bearer {chave}'} if chave else {}
+        return SyncPostgrestClient(url_rest, headers=cabecalhos)
+    url = os.environ['SUPABASE_URL']
+    if '://' not in url:
+        url = f"https://{url}.supabase.co"
+    return create_client(url, chave).postgrest
+
+
+class ArmazenamentoSupabase:
+    # Produtos, usuários e status em tabelas do Supabase (esquema em supabase/esquema.sql),
+    # compartilhadas entre lojas. Um único cliente HTTP por processo, escritas em lotes e
+    # filtros por seção e validade feitos no servidor. As leituras passam pelo cache de
+    # armazenamento.py, invalidado pela 'versao' remota (incrementada por um gatilho).
+
+    filtra_no_banco = True
+    particiona_secoes = False
+
+    def __init__(self, cliente=None):
+        self._cliente = cliente or criar_cliente()
+        self._versao = None
+        self._versao_lida_em = 0.0
+
+    def _tabela(self, nome):
+        # Cada consulta montada aqui vira uma requisição HTTP ao Supabase
+        contar('supabase_requisicao')
+        return self._cliente.from_(nome)
+
+    def _versao_servidor(self):
+        # Lida no servidor, sem o TTL, e guardada para as próximas chamadas de versao()
+        resposta = self._tabela('meta').select('valor').eq('chave', 'versao').execute()
+        self._versao = resposta.data[0]['valor'] if resposta.data else 0
+        self._versao_lida_em = time.monotonic()
+        return self._versao
+
+    def versao(self):
+        if self._versao is None or time.monotonic() - self._versao_lida_em > TTL_VERSAO:
+            return self._versao_servidor()
+        return self._versao
+
+    def _escrever_produtos(self, requisicoes):
+        # Executa as requisições e retorna (versao_antes, versao_depois), lidas no servidor.
+        # O gatilho incrementa a versão uma vez por requisição: se ela andou mais que isso,
+        # outra loja escreveu no meio e versao_antes vira None (quem observa reconstrói).
+        versao_antes = self._versao_servidor()
+        # Durante a escrita, versao() consulta o servidor em vez de devolver a versão guardada
+        self._versao = None
+        for requisicao in requisicoes:
+            requisicao.execute()
+        versao_depois = self._versao_servidor()
+        if versao_depois - versao_antes != len(requisicoes):
+            versao_antes = None
+        return versao_antes, versao_depois
+
+    def contar_produtos(self):
+        return self._tabela('produtos').select('ID', count=CountMethod.exact).limit(1).execute().count
+
+    def inicializar(self):
+        # Importa uma única vez os dados dos arquivos locais para o Supabase
+        if self._tabela('meta').select('chave').eq('chave', 'migrado').execute().data:
+            return []
+        mensagens = importar_arquivos_locais(self)
+        self._tabela('meta').upsert({'chave': 'migrado', 'valor': 1}, returning=ReturnMethod.minimal).execute()
+        return mensagens
+
+    # --- Produtos ---
+    def ler_produtos(self, secao=None, validade_inicio=None, validade_fim=None):
+        registros = []
+        inicio = 0
+        while True:
+            consulta = self._tabela('produtos').select(','.join(COLUNAS_PRODUTOS))
+            if secao is not None:
+                consulta = consulta.eq('Secao', secao)
+            if validade_inicio is not None:
+                consulta = consulta.gte('DataValidade', _data_iso(validade_inicio))
+            if validade_fim is not None:
+                consulta = consulta.lte('DataValidade', _data_iso(validade_fim))
+            # Ordem total (validade, ID) para que a paginação seja estável
+            pagina = consulta.order('DataValidade').order('ID') \
+                .range(inicio, inicio + TAMANHO_PAGINA - 1).execute().data
+            registros.extend(pagina)
+            if len(pagina) < TAMANHO_PAGINA:
+                break
+            inicio += TAMANHO_PAGINA
+        return tipar_produtos(pd.DataFrame(registros, columns=COLUNAS_PRODUTOS))
+
+    def buscar_produto(self, id_produto):
+        registros = self._tabela('produtos').select(','.join(COLUNAS_PRODUTOS)).eq('ID', id_produto).execute().data
+        if not registros:
+            return None
+        return tipar_produtos(pd.DataFrame(registros, columns=COLUNAS_PRODUTOS)).iloc[0].to_dict()
+
+    def inserir_produtos(self, df_novos):
+        # Upsert pelo ID: uma alteração regrava a linha com o mesmo ID
+        registros = produtos_para_texto(df_novos).to_dict('records')
+        return (False, *self._escrever_produtos([
+            self._tabela('produtos').upsert(lote, on_conflict='ID', returning=ReturnMethod.minimal)
+            for lote in _lotes(registros)
+        ]))
+
+    def gravar_produtos(self, df):
+        # Reescrita completa (não atômica no PostgREST): apaga tudo e insere em lotes
+        self._tabela('produtos').delete(returning=ReturnMethod.minimal).neq('ID', '').execute()
+        self.inserir_produtos(df)
+
+    def excluir_produtos(self, ids):
+        return (False, *self._escrever_produtos([
+            self._tabela('produtos').delete(returning=ReturnMethod.minimal).in_('ID', lote)
+            for lote in _lotes(list(ids))
+        ]))
+
+    def compactar(self):
+        # Exclusões já são definitivas no banco; não há lápides a compactar nem versão nova
+        versao = self._versao_servidor()
+        return False, versao, versao
+
+    # --- Usuários ---
+    def ler_usuarios(self):
+        registros = self._tabela('usuarios').select(','.join(COLUNAS_USUARIOS)).execute().data
+        return pd.DataFrame(registros, columns=COLUNAS_USUARIOS)
+
+    def gravar_usuarios(self, df):
+        # Upsert dos usuários atuais e exclusão dos que não estão mais na tabela
+        registros = df[COLUNAS_USUARIOS].to_dict('records')
+        for lote in _lotes(registros):
+            self._tabela('usuarios').upsert(lote, on_conflict='Usuario', returning=ReturnMethod.minimal).execute()
+        exclusao = self._tabela('usuarios').delete(returning=ReturnMethod.minimal)
+        if registros:
+            exclusao = exclusao.not_.in_('Usuario', [r['Usuario'] for r in registros])
+        else:
+            exclusao = exclusao.neq('Usuario', '')
+        exclusao.execute()
+
+    def atualizar_senha(self, usuario, senha_hash):
+        # Um único UPDATE da linha do usuário, sem ler e regravar a tabela
+        self._tabela('usuarios').update({'Senha': senha_hash}, returning=ReturnMethod.minimal) \
+            .eq('Usuario', usuario).execute()
+
+    def versao_usuarios(self):
+        # Sem gatilho na tabela de usuários: a versão é a janela de TTL_USUARIOS segundos
+        return int(time.monotonic() // TTL_USUARIOS)
+
+    # --- Status do Aplicativo ---
+    def ler_status_app(self):
+        registros = self._tabela('status_app').select('status,mensagem').eq('id', 1).execute().data
+        return (registros[0]['status'], registros[0]['mensagem']) if registros else None
+
+    def gravar_status_app(self, status, mensagem):
+        self._tabela('status_app').upsert(
+            {'id': 1, 'status': status, 'mensagem': mensagem}, returning=ReturnMethod.minimal
+        ).execute()
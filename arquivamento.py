@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from armazenamento import (
+    LOJA, PASTA_DADOS, carregar_produtos_por_validade, compactar_produtos, excluir_produtos, tipar_produtos,
+    travar_arquivo,
+)
+from metricas import contar, medir
+from validade import hoje
+
+# Arquivo morto: lotes vencidos há mais de DIAS_ARQUIVAMENTO dias saem da tabela de
+# produtos e vão para Parquet comprimido, particionado pela loja e pelo mês de validade
+# (data/arquivo/Loja=<loja>/AnoMes=AAAA-MM/...). Consultas por período só abrem as
+# partições da loja e do período.
+PASTA_ARQUIVO = os.path.join(PASTA_DADOS, 'arquivo')
+# Loja e mês como texto: sem o esquema, o pyarrow leria 'Loja=01' como o número 1
+PARTICOES_ARQUIVO = ds.partitioning(pa.schema([('Loja', pa.string()), ('AnoMes', pa.string())]), flavor='hive')
+ARQUIVO_LOCK = os.path.join(PASTA_DADOS, 'arquivo.lock')
+DIAS_ARQUIVAMENTO = int(os.environ.get('DIAS_ARQUIVAMENTO', 90))
+# Intervalo entre varreduras automáticas, em segundos (padrão: a cada 6 horas)
+INTERVALO_ARQUIVAMENTO = int(os.environ.get('INTERVALO_ARQUIVAMENTO', 6 * 60 * 60))
+
+
+@medir('arquivamento.arquivar')
+def arquivar_vencidos(dias=DIAS_ARQUIVAMENTO):
+    # Move para o arquivo os lotes vencidos há mais de 'dias' dias; retorna quantos.
+    # A trava de arquivo impede que duas varreduras (de processos diferentes) arquivem
+    # as mesmas linhas; o arquivo é gravado antes da exclusão, então nada se perde.
+    limite = hoje() - pd.Timedelta(days=dias + 1)
+    with travar_arquivo(ARQUIVO_LOCK):
+        df = carregar_produtos_por_validade(None, limite)
+        if df.empty:
+            return 0
+        arquivo = df.astype({'Secao': object})
+        arquivo['Loja'] = LOJA
+        arquivo['AnoMes'] = arquivo['DataValidade'].dt.strftime('%Y-%m')
+        arquivo['DataArquivamento'] = pd.Timestamp(datetime.now())
+        contar('arquivo_escrita')
+        arquivo.to_parquet(PASTA_ARQUIVO, partition_cols=['Loja', 'AnoMes'], compression='zstd', index=False)
+        excluir_produtos(df['ID'], anteriores=df)
+    # Reescreve o arquivo base sem as linhas arquivadas (no-op nos bancos de dados)
+    compactar_produtos()
+    return len(df)
+
+
+def migrar_arquivo_sem_loja():
+    # Arquivos anteriores à dimensão de loja (data/arquivo/AnoMes=.../) eram de uma loja
+    # só: as pastas dos meses passam, sem reescrita, para dentro da pasta da loja atual
+    if not os.path.isdir(PASTA_ARQUIVO):
+        return []
+    with travar_arquivo(ARQUIVO_LOCK):
+        meses = [nome for nome in os.listdir(PASTA_ARQUIVO) if nome.startswith('AnoMes=')]
+        if not meses:
+            return []
+        pasta_loja = os.path.join(PASTA_ARQUIVO, f'Loja={LOJA}')
+        os.makedirs(pasta_loja, exist_ok=True)
+        for nome in meses:
+            os.replace(os.path.join(PASTA_ARQUIVO, nome), os.path.join(pasta_loja, nome))
+    return [f"{len(meses)} meses do arquivo morto movidos para '{pasta_loja}'."]
+
+
+@medir('arquivamento.consultar')
+def consultar_arquivo(validade_inicio=None, validade_fim=None, secao=None):
+    # Lotes da loja atual arquivados com validade no período (inclusive), para auditoria
+    if not os.path.exists(PASTA_ARQUIVO):
+        df = tipar_produtos(pd.DataFrame())
+        df['DataArquivamento'] = pd.Series(dtype='datetime64[ns]')
+        return df
+    filtros = [('Loja', '==', LOJA)]
+    if validade_inicio is not None:
+        validade_inicio = pd.Timestamp(validade_inicio)
+        filtros += [('AnoMes', '>=', validade_inicio.strftime('%Y-%m')), ('DataValidade', '>=', validade_inicio)]
+    if validade_fim is not None:
+        validade_fim = pd.Timestamp(validade_fim)
+        filtros += [('AnoMes', '<=', validade_fim.strftime('%Y-%m')), ('DataValidade', '<=', validade_fim)]
+    if secao is not None:
+        filtros.append(('Secao', '==', secao))
+    contar('arquivo_leitura')
+    df = pd.read_parquet(PASTA_ARQUIVO, filters=filtros, partitioning=PARTICOES_ARQUIVO)
+    # Uma varredura interrompida entre gravar e excluir pode ter arquivado a mesma linha duas vezes
+    df = df.drop_duplicates(subset='ID', keep='last')
+    data_arquivamento = df['DataArquivamento']
+    df = tipar_produtos(df)
+    df['DataArquivamento'] = data_arquivamento
+    return df.sort_values('DataValidade', kind='stable').reset_index(drop=True)
+
+
+_arquivamento_iniciado = threading.Lock()
+
+
+def _laco_arquivamento(intervalo):
+    while True:
+        try:
+            quantidade = arquivar_vencidos()
+            if quantidade:
+                print(f"{quantidade} lotes vencidos há mais de {DIAS_ARQUIVAMENTO} dias arquivados.")
+        except Exception as erro:
+            print(f"Falha no arquivamento automático: {erro}")
+        time.sleep(intervalo)
+
+
+def iniciar_arquivamento_automatico(intervalo=INTERVALO_ARQUIVAMENTO):
+    # Uma única thread de varredura por processo, mesmo chamada a cada reexecução
+    if intervalo <= 0 or not _arquivamento_iniciado.acquire(blocking=False):
+        return
+    threading.Thread(target=_laco_arquivamento, args=(intervalo,), daemon=True, name='arquivamento').start()
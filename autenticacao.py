@@ -0,0 +1,68 @@
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from armazenamento import atualizar_senha_usuario, obter_usuario
+from metricas import medir
+
+# Parâmetros do scrypt (~16 MB de memória por hash): caro para ataques de força bruta,
+# na casa das dezenas de milissegundos para um login
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+TAMANHO_SAL = 16
+# Hashes calculados ao mesmo tempo no processo; limita a memória usada em picos de login
+MAX_HASHES_SIMULTANEOS = 4
+
+# O scrypt do hashlib libera o GIL: rodando no pool, um login não trava as reexecuções
+# das outras sessões, e o número de hashes em paralelo fica limitado
+_executor = ThreadPoolExecutor(max_workers=MAX_HASHES_SIMULTANEOS, thread_name_prefix='hash_senha')
+
+
+def _scrypt(senha, sal, n, r, p):
+    return hashlib.scrypt(senha.encode(), salt=sal, n=n, r=r, p=p, maxmem=256 * n * r + 1024 * 1024)
+
+
+def _calcular_hash(senha):
+    sal = os.urandom(TAMANHO_SAL)
+    chave = _scrypt(senha, sal, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${sal.hex()}${chave.hex()}"
+
+
+def _conferir_hash(senha, senha_hash):
+    # Formato atual: scrypt$n$r$p$sal$chave. Sem '$' é o SHA-256 sem sal das versões antigas.
+    if senha_hash.startswith('scrypt$'):
+        _, n, r, p, sal, chave = senha_hash.split('$')
+        calculada = _scrypt(senha, bytes.fromhex(sal), int(n), int(r), int(p))
+        return hmac.compare_digest(calculada.hex(), chave)
+    return hmac.compare_digest(hashlib.sha256(senha.encode()).hexdigest(), senha_hash)
+
+
+def hash_senha(senha):
+    return _executor.submit(_calcular_hash, senha).result()
+
+
+def verificar_senha(senha, senha_hash):
+    return _executor.submit(_conferir_hash, senha, senha_hash).result()
+
+
+def precisa_rehash(senha_hash):
+    return not senha_hash.startswith(f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
+
+
+# Usado quando o usuário não existe, para que a resposta leve o mesmo tempo
+_HASH_FICTICIO = _calcular_hash('')
+
+
+@medir('autenticacao.login')
+def autenticar(usuario, senha):
+    # Retorna a seção do usuário se a senha conferir, ou None. Senhas ainda em SHA-256
+    # (ou com parâmetros antigos) são regravadas com o hash atual no primeiro login.
+    registro = obter_usuario(usuario)
+    senha_hash, secao = registro if registro is not None else (_HASH_FICTICIO, None)
+    if not verificar_senha(senha, senha_hash) or registro is None:
+        return None
+    if precisa_rehash(senha_hash):
+        atualizar_senha_usuario(usuario, hash_senha(senha))
+    return secao
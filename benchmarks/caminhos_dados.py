@@ -0,0 +1,198 @@
+# Benchmark dos caminhos de dados com produtos sintéticos: gravação, carga (fria e em
+# cache), filtro por seção, status de validade, inserção, exclusão, compactação, alertas,
+# login e a renderização da lista. Cada (backend, tamanho) roda em um processo próprio,
+# em uma pasta temporária, e os resultados saem em JSON.
+# Uso: python benchmarks/caminhos_dados.py [--linhas 10000 100000 1000000]
+#          [--backend csv parquet particionado sqlite] [--saida resultados.json]
+#          [--comparar base.json] [--tolerancia 1.3]
+# Com --comparar, termina com código 1 se algum cenário ficar mais lento que a base
+# além da tolerância (mediana atual / mediana da base).
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+PASTA_REPOSITORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_REPOSITORIO)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+TAMANHOS_PADRAO = [10_000, 100_000, 1_000_000]
+BACKENDS_PADRAO = ['csv', 'parquet', 'sqlite']
+SENHA_BENCHMARK = 'benchmark'
+
+
+def medir(cenario, funcao, preparar=None, repeticoes=5):
+    # Mediana e mínimo de 'repeticoes' execuções; 'preparar' roda antes de cada uma, fora do tempo
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return {'cenario': cenario, 'mediana_s': statistics.median(tempos), 'min_s': min(tempos),
+            'repeticoes': repeticoes}
+
+
+def executar_cenarios(linhas):
+    # Roda dentro do processo filho, já na pasta temporária e com o backend escolhido
+    import pandas as pd
+    from streamlit.testing.v1 import AppTest
+
+    from armazenamento import (
+        adicionar_produto, adicionar_produtos, carregar_produtos, compactar_produtos, excluir_produto,
+        inicializar_produtos, invalidar_cache_produtos, salvar_produtos, salvar_usuarios,
+    )
+    from alertas import produtos_a_vencer
+    from autenticacao import autenticar, hash_senha
+    from dados_sinteticos import gerar_produtos
+    from validade import carregar_produtos_com_validade, status_validade_html, status_validade_texto
+
+    inicializar_produtos()
+    salvar_usuarios(pd.DataFrame([{'Usuario': 'admin', 'Senha': hash_senha(SENHA_BENCHMARK), 'Secao': 'Admin'}]))
+    df = gerar_produtos(linhas)
+    repeticoes = 3 if linhas >= 1_000_000 else 5
+    resultados = [medir('salvar_produtos', lambda: salvar_produtos(df), repeticoes=1)]
+
+    resultados.append(medir('carregar_produtos_frio', carregar_produtos, invalidar_cache_produtos, repeticoes))
+    resultados.append(medir('carregar_produtos_cache', carregar_produtos, repeticoes=repeticoes))
+    resultados.append(medir('filtro_secao', lambda: carregar_produtos('PADARIA'), repeticoes=repeticoes))
+
+    def status():
+        dias = carregar_produtos_com_validade()['Dias Restantes']
+        status_validade_html(dias)
+        status_validade_texto(dias)
+    resultados.append(medir('status_validade', status, repeticoes=repeticoes))
+    resultados.append(medir('alertas_30_dias', lambda: produtos_a_vencer(30), repeticoes=repeticoes))
+
+    # Escritas: o cache é aquecido antes (como na tela, onde a lista já foi carregada)
+    novo = {'CodigoEAN': '7891000100103', 'Item': 'Benchmark', 'DataValidade': '2030-01-01',
+            'Quantidade': 1, 'Secao': 'PADARIA'}
+    resultados.append(medir('inserir_um', lambda: adicionar_produto(novo), carregar_produtos, repeticoes))
+    lotes = iter(range(1, 100))
+    resultados.append(medir(
+        'inserir_lote_1000', lambda: adicionar_produtos(gerar_produtos(1000, semente=next(lotes)).drop(columns='ID')),
+        carregar_produtos, repeticoes,
+    ))
+    # Como na tela, que passa a seção da linha clicada
+    ids = iter(zip(df['ID'].tolist(), df['Secao'].tolist()))
+    resultados.append(medir('excluir_um', lambda: excluir_produto(*next(ids)), carregar_produtos, repeticoes))
+    resultados.append(medir('compactar', compactar_produtos, repeticoes=1))
+
+    if os.environ.get('BACKEND_ARMAZENAMENTO') == 'particionado':
+        # Visão da rede: todas as partições no pool de processos e, depois de uma
+        # inserção, só a partição alterada
+        from consolidacao import ConsolidacaoRede
+        rede = {}
+
+        def preparar_rede():
+            rede['consolidacao'] = ConsolidacaoRede()
+        preparar_rede()
+        rede['consolidacao'].tabela()  # sobe o pool fora do tempo
+        resultados.append(medir('consolidacao_rede_fria', lambda: rede['consolidacao'].tabela(),
+                                preparar_rede, repeticoes))
+        resultados.append(medir('consolidacao_rede_incremental', lambda: rede['consolidacao'].tabela(),
+                                lambda: adicionar_produto(novo), repeticoes))
+
+    resultados.append(medir('login', lambda: autenticar('admin', SENHA_BENCHMARK), repeticoes=repeticoes))
+
+    # Renderização completa da tela para um administrador já logado (todas as abas)
+    tela = {}
+
+    def preparar_tela():
+        tela['app'] = AppTest.from_file(os.path.join(PASTA_REPOSITORIO, 'app.py'), default_timeout=600)
+        tela['app'].session_state['logado'] = True
+        tela['app'].session_state['usuario'] = 'admin'
+        tela['app'].session_state['secao'] = 'Admin'
+    resultados.append(medir('render_tela_admin', lambda: tela['app'].run(), preparar_tela, repeticoes))
+    return resultados
+
+
+def executar_em_processo(backend, linhas):
+    # Processo novo por caso: caches, conexões e a pasta 'data' começam do zero
+    with tempfile.TemporaryDirectory() as pasta:
+        ambiente = dict(os.environ, BACKEND_ARMAZENAMENTO=backend, INTERVALO_ARQUIVAMENTO='0')
+        saida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--executar', str(linhas)],
+            cwd=pasta, env=ambiente, capture_output=True, text=True,
+        )
+    if saida.returncode != 0:
+        raise RuntimeError(f"Falha em {backend}/{linhas}:\n{saida.stderr[-2000:]}")
+    resultados = json.loads(saida.stdout.strip().splitlines()[-1])
+    for resultado in resultados:
+        resultado.update(backend=backend, linhas=linhas)
+    return resultados
+
+
+def comparar(resultados, base, tolerancia):
+    # Cenários mais lentos que a base além da tolerância
+    chave = lambda r: (r['backend'], r['linhas'], r['cenario'])
+    anteriores = {chave(r): r for r in base['resultados']}
+    regressoes = []
+    for resultado in resultados:
+        anterior = anteriores.get(chave(resultado))
+        if anterior and resultado['mediana_s'] > anterior['mediana_s'] * tolerancia:
+            regressoes.append((resultado, resultado['mediana_s'] / anterior['mediana_s']))
+    return regressoes
+
+
+def commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PASTA_REPOSITORIO,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, nargs='+', default=TAMANHOS_PADRAO)
+    parser.add_argument('--backend', nargs='+', default=BACKENDS_PADRAO)
+    parser.add_argument('--saida', help="arquivo JSON de resultados (padrão: só imprime)")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument('--tolerancia', type=float, default=1.3)
+    parser.add_argument('--executar', type=int, help=argparse.SUPPRESS)
+    argumentos = parser.parse_args()
+
+    if argumentos.executar:
+        # Processo filho: a última linha da saída é o JSON com os resultados
+        print(json.dumps(executar_cenarios(argumentos.executar)))
+        sys.exit(0)
+
+    import pandas as pd
+    resultados = []
+    for backend in argumentos.backend:
+        for linhas in argumentos.linhas:
+            for resultado in executar_em_processo(backend, linhas):
+                resultados.append(resultado)
+                print(f"{backend:>8} {linhas:>9} {resultado['cenario']:<24} {resultado['mediana_s'] * 1000:>10.1f} ms",
+                      file=sys.stderr)
+
+    relatorio = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit_atual(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'plataforma': platform.platform(),
+        'resultados': resultados,
+    }
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if argumentos.saida:
+        with open(argumentos.saida, 'w', encoding='utf-8') as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+    if argumentos.comparar:
+        with open(argumentos.comparar, encoding='utf-8') as f:
+            regressoes = comparar(resultados, json.load(f), argumentos.tolerancia)
+        for resultado, razao in regressoes:
+            print(f"REGRESSÃO {resultado['backend']}/{resultado['linhas']}/{resultado['cenario']}: "
+                  f"{razao:.2f}x mais lento que a base", file=sys.stderr)
+        sys.exit(1 if regressoes else 0)
@@ -0,0 +1,148 @@
+# Teste de carga sem navegador: várias sessões simultâneas (AppTest) fazem login,
+# cadastram e excluem itens sobre uma base sintética, e a latência de cada reexecução
+# do script é medida. Resultado em JSON (percentis por ação e erros).
+# Cada sessão roda em um processo próprio (o AppTest não pode rodar em várias threads
+# do mesmo processo), todas sobre a mesma pasta de dados: as escritas concorrem no
+# backend como no servidor, mas os caches do Streamlit não são compartilhados.
+# Uso: python benchmarks/carga_sessoes.py [--sessoes 8] [--iteracoes 5] [--linhas 10000]
+#          [--backend csv] [--saida carga.json]
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from collections import defaultdict
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+PASTA_REPOSITORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_REPOSITORIO)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SENHA_CARGA = 'carga'
+
+
+def _percentil(valores, fracao):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(fracao * len(ordenados)))]
+
+
+def _executar(tempos, acao, app):
+    inicio = time.perf_counter()
+    app.run()
+    tempos[acao].append(time.perf_counter() - inicio)
+    if app.exception:
+        raise RuntimeError(f"{acao}: {app.exception[0].message}")
+
+
+def sessao(numero, iteracoes):
+    # Uma sessão de um usuário de seção: login, depois cadastra e exclui um item por iteração
+    from streamlit.testing.v1 import AppTest
+
+    tempos = defaultdict(list)
+    app = AppTest.from_file(os.path.join(PASTA_REPOSITORIO, 'app.py'), default_timeout=600)
+    _executar(tempos, 'abrir', app)
+    app.text_input[0].input(f'usuario{numero}')
+    app.text_input[1].input(SENHA_CARGA)
+    app.button[0].click()
+    _executar(tempos, 'login', app)
+    for iteracao in range(iteracoes):
+        campo = {t.label: t for t in app.text_input}
+        campo['Código EAN'].input('7891000100103')
+        campo['Nome do Item'].input(f'Carga {numero}-{iteracao}')
+        next(b for b in app.button if b.label == 'Salvar Item').click()
+        _executar(tempos, 'cadastrar', app)
+        next(b for b in app.button if b.label == 'Excluir Item').click()
+        _executar(tempos, 'excluir', app)
+    return dict(tempos)
+
+
+def executar_carga(sessoes, iteracoes, linhas):
+    # Roda no processo filho, na pasta temporária: prepara base e usuários e dispara as sessões
+    import pandas as pd
+
+    from armazenamento import inicializar_produtos, salvar_produtos, salvar_usuarios
+    from autenticacao import hash_senha
+    from dados_sinteticos import gerar_produtos
+    from secoes import SECOES
+
+    inicializar_produtos()
+    salvar_produtos(gerar_produtos(linhas))
+    senha = hash_senha(SENHA_CARGA)
+    salvar_usuarios(pd.DataFrame([
+        {'Usuario': f'usuario{n}', 'Senha': senha, 'Secao': SECOES[n % len(SECOES)]} for n in range(sessoes)
+    ] + [{'Usuario': 'admin', 'Senha': senha, 'Secao': 'Admin'}]))
+
+    tempos, erros = defaultdict(list), []
+    inicio = time.perf_counter()
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=sessoes, mp_context=contexto) as executor:
+        futuros = [executor.submit(sessao, n, iteracoes) for n in range(sessoes)]
+        for futuro in futuros:
+            try:
+                for acao, valores in futuro.result().items():
+                    tempos[acao].extend(valores)
+            except Exception as erro:
+                erros.append(''.join(traceback.format_exception_only(erro)).strip())
+    duracao = time.perf_counter() - inicio
+
+    return {
+        'duracao_s': duracao,
+        'reexecucoes_por_s': sum(len(v) for v in tempos.values()) / duracao,
+        'erros': erros,
+        'acoes': {
+            acao: {'n': len(valores), 'p50_s': statistics.median(valores), 'p95_s': _percentil(valores, 0.95),
+                   'max_s': max(valores)}
+            for acao, valores in tempos.items()
+        },
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sessoes', type=int, default=8)
+    parser.add_argument('--iteracoes', type=int, default=5)
+    parser.add_argument('--linhas', type=int, default=10_000)
+    parser.add_argument('--backend', default='csv')
+    parser.add_argument('--saida', help="arquivo JSON de resultados (padrão: só imprime)")
+    parser.add_argument('--executar', action='store_true', help=argparse.SUPPRESS)
+    argumentos = parser.parse_args()
+
+    if argumentos.executar:
+        print(json.dumps(executar_carga(argumentos.sessoes, argumentos.iteracoes, argumentos.linhas)))
+        sys.exit(0)
+
+    # Processo e pasta de dados próprios, como em caminhos_dados.py
+    with tempfile.TemporaryDirectory() as pasta:
+        ambiente = dict(os.environ, BACKEND_ARMAZENAMENTO=argumentos.backend, INTERVALO_ARQUIVAMENTO='0')
+        saida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--executar', '--sessoes', str(argumentos.sessoes),
+             '--iteracoes', str(argumentos.iteracoes), '--linhas', str(argumentos.linhas)],
+            cwd=pasta, env=ambiente, capture_output=True, text=True,
+        )
+    if saida.returncode != 0:
+        sys.exit(f"Falha no teste de carga:\n{saida.stderr[-2000:]}")
+
+    relatorio = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'backend': argumentos.backend,
+        'sessoes': argumentos.sessoes,
+        'iteracoes': argumentos.iteracoes,
+        'linhas': argumentos.linhas,
+        **json.loads(saida.stdout.strip().splitlines()[-1]),
+    }
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if argumentos.saida:
+        with open(argumentos.saida, 'w', encoding='utf-8') as f:
+            f.write(texto)
+    else:
+        print(texto)
+    sys.exit(1 if relatorio['erros'] else 0)
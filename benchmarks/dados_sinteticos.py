@@ -0,0 +1,52 @@
+# Gerador de produtos sintéticos para os benchmarks, reprodutível pela semente (inclusive os IDs)
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from secoes import SECOES
+
+NOMES_BASE = [
+    'Leite Integral', 'Pão Francês', 'Queijo Mussarela', 'Presunto', 'Iogurte Natural', 'Arroz Branco',
+    'Feijão Carioca', 'Biscoito Recheado', 'Refrigerante Cola', 'Sabão em Pó', 'Detergente', 'Macarrão',
+    'Molho de Tomate', 'Café Torrado', 'Achocolatado', 'Margarina', 'Frango Congelado', 'Alcatra',
+]
+
+
+def gerar_eans(quantidade, rng):
+    # EAN-13 com prefixo 789 (Brasil) e dígito verificador válido
+    corpo = rng.integers(0, 10 ** 9, size=quantidade)
+    textos = np.char.add('789', np.char.zfill(corpo.astype(str), 9))
+    digitos = np.array([list(t) for t in textos], dtype=np.int64) if quantidade else np.zeros((0, 12), np.int64)
+    verificador = (10 - (digitos @ np.tile([1, 3], 6)) % 10) % 10
+    return np.char.add(textos, verificador.astype(str))
+
+
+def gerar_produtos(linhas, semente=42, skus=None):
+    # 'linhas' lotes distribuídos entre todas as SECOES, com validades de 120 dias atrás
+    # até 1 ano à frente. Cada SKU (EAN) tem nome e seção fixos, como no estoque real.
+    rng = np.random.default_rng(semente)
+    skus = skus or max(1, min(linhas // 5, 100_000))
+    eans = gerar_eans(skus, rng)
+    nomes = np.char.add(np.array(NOMES_BASE)[rng.integers(0, len(NOMES_BASE), skus)],
+                        np.char.add(' ', np.arange(skus).astype(str)))
+    secoes_sku = np.array(SECOES)[rng.integers(0, len(SECOES), skus)]
+    sku = rng.integers(0, skus, size=linhas)
+    hoje = pd.Timestamp.today().normalize()
+    df = pd.DataFrame({
+        'CodigoEAN': eans[sku],
+        'Item': nomes[sku],
+        'DataValidade': (hoje + pd.to_timedelta(rng.integers(-120, 365, size=linhas), unit='D')).strftime('%Y-%m-%d'),
+        'Lote': np.char.add('L', rng.integers(1000, 9999, size=linhas).astype(str)),
+        'Quantidade': rng.integers(1, 50, size=linhas),
+        'DataRegistro': (hoje - pd.to_timedelta(rng.integers(0, 60 * 24 * 60, size=linhas), unit='min'))
+        .strftime('%Y-%m-%d %H:%M:%S'),
+        'Secao': secoes_sku[sku],
+    })
+    # IDs de 32 dígitos hexadecimais (como uuid4().hex), tirados da mesma semente
+    bytes_ids = rng.bytes(16 * linhas).hex()
+    df.insert(0, 'ID', [bytes_ids[i:i + 32] for i in range(0, 32 * linhas, 32)])
+    return df
@@ -0,0 +1,73 @@
+# Micro-benchmark: status de validade por linha (.apply) x vetorizado (validade.py)
+# Uso: python benchmarks/status_validade.py [linhas ...]   (padrão: 100000 1000000)
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from validade import classificar_validade, dias_restantes, hoje, status_validade_html, status_validade_texto
+
+
+# Implementação anterior de tela_cadastro_item, mantida aqui só para comparação
+def obter_status_validade_html(dias_restantes):
+    if dias_restantes < 0:
+        return f'<span style="color:red; font-weight:bold;">VENCIDO ({abs(dias_restantes)} dias)</span>'
+    elif dias_restantes <= 5:
+        return f'<span style="color:orange; font-weight:bold;">Vence em {dias_restantes} dias</span>'
+    elif dias_restantes <= 30:
+        return f'<span style="color:yellow; font-weight:bold;">Vence em {dias_restantes} dias</span>'
+    else:
+        return f'<span style="color:green; font-weight:bold;">Retido ({dias_restantes} dias)</span>'
+
+
+def obter_status_validade_texto(dias_restantes):
+    if dias_restantes < 0:
+        return f'VENCIDO ({abs(dias_restantes)} dias)'
+    elif dias_restantes <= 5:
+        return f'Vence em {dias_restantes} dias'
+    elif dias_restantes <= 30:
+        return f'Vence em {dias_restantes} dias'
+    else:
+        return f'Retido ({dias_restantes} dias)'
+
+
+def gerar_datas(linhas, semente=42):
+    rng = np.random.default_rng(semente)
+    return pd.Series(hoje() + pd.to_timedelta(rng.integers(-60, 365, size=linhas), unit='D'))
+
+
+def versao_apply(datas, data_referencia):
+    dias = dias_restantes(datas, data_referencia)
+    return dias.apply(obter_status_validade_html), dias.apply(obter_status_validade_texto)
+
+
+def versao_vetorizada(datas, data_referencia):
+    dias = dias_restantes(datas, data_referencia)
+    classificar_validade(dias)
+    return status_validade_html(dias), status_validade_texto(dias)
+
+
+def medir(funcao, *args, repeticoes=3):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+if __name__ == '__main__':
+    tamanhos = [int(n) for n in sys.argv[1:]] or [100_000, 1_000_000]
+    data_referencia = hoje()
+    print(f"{'linhas':>10} {'apply (s)':>10} {'vetorizado (s)':>15} {'ganho':>7}")
+    for linhas in tamanhos:
+        datas = gerar_datas(linhas)
+        tempo_apply, (html_apply, texto_apply) = medir(versao_apply, datas, data_referencia)
+        tempo_vetor, (html_vetor, texto_vetor) = medir(versao_vetorizada, datas, data_referencia)
+        # Os dois caminhos precisam produzir exatamente o mesmo texto
+        assert (html_apply == html_vetor).all() and (texto_apply == texto_vetor).all()
+        print(f"{linhas:>10} {tempo_apply:>10.3f} {tempo_vetor:>15.3f} {tempo_apply / tempo_vetor:>6.1f}x")
@@ -0,0 +1,174 @@
+import bisect
+import os
+import threading
+import unicodedata
+
+import pandas as pd
+
+from armazenamento import carregar_produtos, registrar_observador, versao_produtos
+from arquivamento import PASTA_ARQUIVO
+from metricas import contar, medir
+
+LIMITE_SUGESTOES = 10
+
+
+def normalizar_nome(nome):
+    # Busca sem diferenciar maiúsculas nem acentos ('Pão' e 'pao' são a mesma chave)
+    sem_acentos = unicodedata.normalize('NFKD', str(nome)).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(sem_acentos.lower().split())
+
+
+def _historico():
+    # Produtos ativos mais os lotes já arquivados: quanto mais histórico, melhor o catálogo
+    df = carregar_produtos()[['CodigoEAN', 'Item', 'Secao']].astype(object)
+    if os.path.exists(PASTA_ARQUIVO):
+        contar('arquivo_leitura')
+        arquivados = pd.read_parquet(PASTA_ARQUIVO, columns=['CodigoEAN', 'Item', 'Secao']).astype(object)
+        df = pd.concat([arquivados, df], ignore_index=True)
+    return df
+
+
+def _chaves_nome(nome_normalizado, ean):
+    # O nome inteiro e cada sufixo que começa em uma palavra
+    chaves = [(nome_normalizado, ean)]
+    espaco = nome_normalizado.find(' ')
+    while espaco >= 0:
+        chaves.append((nome_normalizado[espaco + 1:], ean))
+        espaco = nome_normalizado.find(' ', espaco + 1)
+    return chaves
+
+
+def _contagens(df, coluna):
+    # (EAN, valor) -> vezes registrado, montado a partir de listas (mais rápido que to_dict)
+    contagens = df.groupby(['CodigoEAN', coluna], sort=False).size()
+    chaves = zip(contagens.index.get_level_values(0).tolist(), contagens.index.get_level_values(1).tolist())
+    return contagens, dict(zip(chaves, contagens.tolist()))
+
+
+def _mais_frequentes(contagens):
+    # Série (EAN, valor) -> contagem: o valor mais frequente de cada EAN
+    if contagens.empty:
+        return {}
+    df = contagens.rename('n').reset_index()
+    df = df.sort_values('n', ascending=False, kind='stable').drop_duplicates(df.columns[0])
+    return dict(zip(df.iloc[:, 0].tolist(), df.iloc[:, 1].tolist()))
+
+
+class CatalogoProdutos:
+    # Cadastro mestre montado a partir dos registros: EAN -> (nome mais usado, seção mais
+    # usada). Para a busca por nome, uma lista ordenada com cada nome normalizado e cada
+    # sufixo a partir de uma palavra ('leite integral', 'integral'), de modo que um prefixo
+    # é uma busca binária seguida de uma leitura contígua. Inserções deste processo só
+    # atualizam as contagens do EAN; escritas de fora reconstroem o catálogo.
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.versao = None
+        self.contagem_nomes = {}    # (EAN, nome) -> vezes registrado
+        self.contagem_secoes = {}   # (EAN, seção) -> vezes registrado
+        self.produtos = {}          # EAN -> (nome canônico, seção usual)
+        self.chaves = []            # (nome normalizado ou sufixo, EAN), ordenadas
+
+    def _atualizar_chaves(self, ean, nome_antigo, nome_novo):
+        if nome_antigo is not None:
+            for chave in _chaves_nome(normalizar_nome(nome_antigo), ean):
+                # Só remove se a chave estiver lá: a posição vizinha é de outro produto
+                posicao = bisect.bisect_left(self.chaves, chave)
+                if posicao < len(self.chaves) and self.chaves[posicao] == chave:
+                    del self.chaves[posicao]
+        for chave in _chaves_nome(normalizar_nome(nome_novo), ean):
+            bisect.insort(self.chaves, chave)
+
+    def _contar_linhas(self, df):
+        # Soma as linhas novas às contagens e troca o nome/seção canônicos de um EAN
+        # quando outro valor passa a ser o mais registrado
+        df = df[(df['CodigoEAN'] != '') & (df['Item'] != '')]
+        for ean, nome in zip(df['CodigoEAN'], df['Item']):
+            self.contagem_nomes[(ean, nome)] = self.contagem_nomes.get((ean, nome), 0) + 1
+            nome_atual, secao_atual = self.produtos.get(ean, (None, ''))
+            if nome_atual != nome and (
+                    nome_atual is None or self.contagem_nomes[(ean, nome)] > self.contagem_nomes[(ean, nome_atual)]):
+                self.produtos[ean] = (nome, secao_atual)
+                self._atualizar_chaves(ean, nome_atual, nome)
+        for ean, secao in zip(df['CodigoEAN'], df['Secao']):
+            if not secao:
+                continue
+            self.contagem_secoes[(ean, secao)] = self.contagem_secoes.get((ean, secao), 0) + 1
+            nome_atual, secao_atual = self.produtos[ean]
+            if secao_atual != secao and (
+                    not secao_atual or self.contagem_secoes[(ean, secao)] > self.contagem_secoes[(ean, secao_atual)]):
+                self.produtos[ean] = (nome_atual, secao)
+
+    @medir('transformacao.catalogo')
+    def reconstruir(self, versao):
+        # Contagens por groupby; nomes normalizados de uma vez com os métodos .str
+        df = _historico().fillna('')
+        df = df[(df['CodigoEAN'] != '') & (df['Item'] != '')]
+        nomes, self.contagem_nomes = _contagens(df, 'Item')
+        secoes, self.contagem_secoes = _contagens(df[df['Secao'] != ''], 'Secao')
+        secao_usual = _mais_frequentes(secoes)
+        self.produtos = {ean: (nome, secao_usual.get(ean, '')) for ean, nome in _mais_frequentes(nomes).items()}
+        eans = list(self.produtos)
+        normalizados = (pd.Series([nome for nome, _ in self.produtos.values()], dtype=object)
+                        .str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+                        .str.lower().str.split().str.join(' ').tolist())
+        self.chaves = sorted(chave for nome, ean in zip(normalizados, eans) for chave in _chaves_nome(nome, ean))
+        # Só fica com a versão se ela não mudou durante a leitura do histórico
+        self.versao = versao if versao_produtos() == versao else None
+
+    def ao_escrever(self, evento, dados, versao_antes, versao_depois, anteriores):
+        # Exclusões e arquivamento não apagam o histórico: o catálogo só aprende
+        with self._trava:
+            if self.versao is None or self.versao != versao_antes:
+                self.versao = None
+                return
+            if evento == 'inserir':
+                self._contar_linhas(dados[['CodigoEAN', 'Item', 'Secao']].astype(object).fillna(''))
+            self.versao = versao_depois
+
+    def _atualizado(self):
+        versao = versao_produtos()
+        if self.versao != versao:
+            self.reconstruir(versao)
+
+    def buscar_ean(self, ean):
+        with self._trava:
+            self._atualizado()
+            return self.produtos.get(str(ean).strip())
+
+    def buscar_nome(self, prefixo, limite=LIMITE_SUGESTOES):
+        # EANs cujo nome (ou alguma palavra do nome em diante) começa com o prefixo
+        prefixo = normalizar_nome(prefixo)
+        if not prefixo:
+            return []
+        with self._trava:
+            self._atualizado()
+            encontrados = []
+            posicao = bisect.bisect_left(self.chaves, (prefixo,))
+            while posicao < len(self.chaves) and len(encontrados) < limite:
+                chave, ean = self.chaves[posicao]
+                if not chave.startswith(prefixo):
+                    break
+                if ean not in encontrados:
+                    encontrados.append(ean)
+                posicao += 1
+            return [(ean,) + self.produtos[ean] for ean in encontrados]
+
+
+_catalogo = CatalogoProdutos()
+registrar_observador(_catalogo.ao_escrever)
+
+
+def buscar_produto_por_ean(ean):
+    # (nome canônico, seção usual) do EAN, ou None se nunca foi registrado
+    return _catalogo.buscar_ean(ean)
+
+
+def buscar_catalogo(texto, limite=LIMITE_SUGESTOES):
+    # Sugestões (EAN, nome, seção) para o texto digitado: o próprio EAN, se conhecido,
+    # senão os produtos cujo nome começa com o texto
+    texto = str(texto).strip()
+    produto = buscar_produto_por_ean(texto)
+    if produto is not None:
+        return [(texto,) + produto]
+    return _catalogo.buscar_nome(texto, limite)
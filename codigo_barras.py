@@ -0,0 +1,16 @@
+import os
+
+import streamlit.components.v1 as components
+
+# --- Leitor na Câmera (componente) ---
+# A decodificação acontece no navegador (BarcodeDetector nativo ou, sem ele, o mesmo
+# algoritmo de ean.decodificar_ean em JavaScript): só o código lido volta para o servidor,
+# nenhuma imagem da câmera é enviada. A câmera exige HTTPS (ou localhost).
+PASTA_COMPONENTE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'componentes', 'leitor_codigo_barras')
+_leitor = components.declare_component('leitor_codigo_barras', path=PASTA_COMPONENTE)
+
+
+def leitor_codigo_barras(key=None, on_change=None):
+    # Retorna {'codigo': '789...', 'lido_em': <ms>} da última leitura, ou None. 'lido_em'
+    # muda a cada leitura, então o mesmo código lido duas vezes dispara on_change de novo.
+    return _leitor(key=key, default=None, on_change=on_change)
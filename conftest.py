@@ -0,0 +1,2 @@
+# Os módulos do app ficam na raiz (sem pacote): este arquivo faz o pytest colocá-la no
+# sys.path, para que os testes em tests/ importem 'ean', 'armazenamento' etc.
@@ -0,0 +1,170 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import PASTA_LOJAS, ArmazenamentoArquivos
+from armazenamento_particionado import listar_particoes
+from metricas import medir
+from painel import SEMANAS_PAINEL
+from validade import LIMITE_ATENCAO, classificar_validade, dia_absoluto, hoje
+
+# --- Visão Consolidada da Rede ---
+# Risco de vencimento de todas as partições (loja, seção) do armazenamento particionado.
+# Cada partição é reduzida, em um pool de processos, a totais por dia de validade (poucas
+# centenas de linhas, que não dependem da data de hoje). O processo guarda esses totais
+# junto com a versão da partição e, nas consultas seguintes, só manda reduzir de novo as
+# partições que mudaram: a rede inteira é lida em paralelo uma vez, depois só o alterado.
+PROCESSOS_CONSOLIDACAO = int(os.environ.get('PROCESSOS_CONSOLIDACAO', os.cpu_count() or 2))
+# Com poucas partições alteradas, reduzir aqui mesmo sai mais barato que ir ao pool
+MINIMO_PARTICOES_POOL = 4
+
+
+def totais_particao(pasta):
+    # (dias, quantidades, lotes) de uma partição. Roda nos processos do pool: lê só as
+    # colunas necessárias e devolve arrays pequenos, baratos de enviar de volta.
+    df = ArmazenamentoArquivos('parquet', pasta).ler_produtos(colunas=['ID', 'DataValidade', 'Quantidade'])
+    df = df[df['DataValidade'].notna()]
+    grupos = pd.DataFrame({
+        'Dia': dia_absoluto(df['DataValidade']),
+        'Quantidade': df['Quantidade'].to_numpy(),
+    }).groupby('Dia')['Quantidade'].agg(['sum', 'size'])
+    return (grupos.index.to_numpy(np.int64), grupos['sum'].to_numpy(np.int64),
+            grupos['size'].to_numpy(np.int64))
+
+
+_trava_pool = threading.Lock()
+_executor = None
+
+
+def _pool():
+    # Criado na primeira consulta e reaproveitado. 'spawn': os processos não herdam as
+    # threads do servidor do Streamlit.
+    global _executor
+    with _trava_pool:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=PROCESSOS_CONSOLIDACAO, mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def _reduzir(pastas):
+    global _executor
+    if len(pastas) < MINIMO_PARTICOES_POOL:
+        return [totais_particao(pasta) for pasta in pastas]
+    executor = _pool()
+    try:
+        return list(executor.map(
+            totais_particao, pastas, chunksize=max(1, len(pastas) // (PROCESSOS_CONSOLIDACAO * 4)),
+        ))
+    except BrokenProcessPool:
+        # Um processo morreu (falta de memória, por exemplo): a próxima consulta recria o pool
+        with _trava_pool:
+            if _executor is executor:
+                _executor = None
+        raise
+
+
+class ConsolidacaoRede:
+    # Totais por dia de validade de cada partição, guardados com a versão dela. Qualquer
+    # processo (de qualquer loja) pode escrever nas partições: a versão em disco decide.
+
+    def __init__(self, pasta_lojas=PASTA_LOJAS):
+        self.pasta_lojas = pasta_lojas
+        self._trava = threading.Lock()
+        self.totais = {}        # pasta -> (versão, loja, seção, dias, quantidades, lotes)
+        self._tabela = None     # (data de referência, DataFrame)
+
+    @medir('transformacao.consolidacao_rede')
+    def _atualizar(self):
+        # A versão é lida antes da partição: se ela mudar no meio, a próxima consulta refaz
+        particoes = listar_particoes(self.pasta_lojas)
+        versoes = {pasta: ArmazenamentoArquivos('parquet', pasta).versao() for _, _, pasta in particoes}
+        mudaram = [
+            (loja, secao, pasta) for loja, secao, pasta in particoes
+            if pasta not in self.totais or self.totais[pasta][0] != versoes[pasta]
+        ]
+        for (loja, secao, pasta), totais in zip(mudaram, _reduzir([pasta for _, _, pasta in mudaram])):
+            self.totais[pasta] = (versoes[pasta], loja, secao) + totais
+        removidas = set(self.totais) - set(versoes)
+        for pasta in removidas:
+            del self.totais[pasta]
+        return bool(mudaram or removidas)
+
+    def tabela(self):
+        # Totais como DataFrame (Loja, Secao, Dia, Quantidade, Lotes, Dias Restantes, Faixa,
+        # Semana), remontado quando alguma partição muda ou o dia vira
+        with self._trava:
+            mudou = self._atualizar()
+            data_referencia = hoje()
+            if mudou or self._tabela is None or self._tabela[0] != data_referencia:
+                self._tabela = (data_referencia, self._montar(data_referencia))
+            return self._tabela[1]
+
+    def lojas(self):
+        # Lojas com alguma partição em disco, mesmo que sem lotes
+        with self._trava:
+            return sorted({loja for _, loja, _, _, _, _ in self.totais.values()})
+
+    def _montar(self, data_referencia):
+        totais = list(self.totais.values())
+        tamanhos = [len(dias) for _, _, _, dias, _, _ in totais]
+        df = pd.DataFrame({
+            'Loja': np.repeat([loja for _, loja, _, _, _, _ in totais], tamanhos).astype(object),
+            'Secao': np.repeat([secao for _, _, secao, _, _, _ in totais], tamanhos).astype(object),
+            'Dia': np.concatenate([dias for _, _, _, dias, _, _ in totais] or [np.empty(0, np.int64)]),
+            'Quantidade': np.concatenate([qtd for _, _, _, _, qtd, _ in totais] or [np.empty(0, np.int64)]),
+            'Lotes': np.concatenate([lotes for _, _, _, _, _, lotes in totais] or [np.empty(0, np.int64)]),
+        })
+        dia_hoje = int(dia_absoluto([data_referencia])[0])
+        df['Dias Restantes'] = df['Dia'] - dia_hoje
+        df['Faixa'] = classificar_validade(df['Dias Restantes'])
+        # Semanas começando na segunda-feira (1970-01-01 foi uma quinta-feira)
+        df['Semana'] = pd.to_datetime(df['Dia'] - (df['Dia'] + 3) % 7, unit='D')
+        return df
+
+
+_consolidacao = ConsolidacaoRede()
+
+
+def _em_risco():
+    # Lotes vencidos ou vencendo em até LIMITE_ATENCAO dias
+    df = _consolidacao.tabela()
+    return df[df['Dias Restantes'] <= LIMITE_ATENCAO]
+
+
+def resumo_rede():
+    # Lojas, lotes ativos e quantidade em risco na rede inteira
+    df = _consolidacao.tabela()
+    em_risco = _em_risco()
+    return {
+        'lojas': len(_consolidacao.lojas()),
+        'lotes': int(df['Lotes'].sum()),
+        'quantidade_em_risco': int(em_risco['Quantidade'].sum()),
+        'lotes_em_risco': int(em_risco['Lotes'].sum()),
+    }
+
+
+def risco_por_loja():
+    # Quantidade vencida ou vencendo em até LIMITE_ATENCAO dias, por loja e faixa
+    return (_em_risco().groupby(['Loja', 'Faixa'], observed=True)['Quantidade'].sum()
+            .reset_index().sort_values('Loja'))
+
+
+def risco_por_loja_e_secao():
+    # Mesma quantidade em risco, em uma tabela loja x seção
+    return _em_risco().pivot_table(
+        index='Loja', columns='Secao', values='Quantidade', aggfunc='sum', fill_value=0,
+    )
+
+
+def vencimentos_por_semana_rede(semanas=SEMANAS_PAINEL):
+    # Quantidade e lotes que vencem em cada uma das próximas 'semanas' semanas, por loja
+    df = _consolidacao.tabela()
+    df = df[(df['Dias Restantes'] >= 0) & (df['Dias Restantes'] < semanas * 7)]
+    return df.groupby(['Semana', 'Loja'])[['Quantidade', 'Lotes']].sum().reset_index()
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+from metricas import medir
+
+# --- Códigos EAN ---
+# Validação e leitura de códigos de barras sem Streamlit nem armazenamento: usado pela
+# importação, pelo cadastro (fotos enviadas) e importável em testes e scripts.
+
+
+def ean_valido(eans):
+    # EAN-8/UPC-A/EAN-13/GTIN-14 com dígito verificador correto, para a série inteira de uma vez:
+    # os códigos viram uma matriz de dígitos (completada com zeros à esquerda até 14)
+    eans = eans.astype(str)
+    formato_ok = eans.str.fullmatch(r'\d{8}|\d{12,14}').fillna(False).to_numpy(dtype=bool)
+    completos = eans.where(formato_ok, '0' * 14).str.zfill(14)
+    digitos = np.frombuffer(''.join(completos).encode('ascii'), dtype=np.uint8).reshape(-1, 14) - ord('0')
+    pesos = np.tile([3, 1], 7)[:13]
+    verificador = (10 - (digitos[:, :13].astype(np.int64) @ pesos) % 10) % 10
+    return pd.Series(formato_ok & (verificador == digitos[:, 13]), index=eans.index)
+
+
+# --- Decodificador (imagens enviadas) ---
+# Larguras (em módulos) das 4 barras/espaços de cada dígito no código L; o código G é o
+# L invertido e o código R tem as mesmas larguras do L (começando por barra)
+PADROES_L = {
+    '0': (3, 2, 1, 1), '1': (2, 2, 2, 1), '2': (2, 1, 2, 2), '3': (1, 4, 1, 1), '4': (1, 1, 3, 2),
+    '5': (1, 2, 3, 1), '6': (1, 1, 1, 4), '7': (1, 3, 1, 2), '8': (1, 2, 1, 3), '9': (3, 1, 1, 2),
+}
+PADROES_G = {digito: larguras[::-1] for digito, larguras in PADROES_L.items()}
+# Paridade (L/G) dos 6 dígitos da esquerda do EAN-13 -> primeiro dígito
+PRIMEIRO_DIGITO = {
+    'LLLLLL': '0', 'LLGLGG': '1', 'LLGGLG': '2', 'LLGGGL': '3', 'LGLLGG': '4',
+    'LGGLLG': '5', 'LGGGLL': '6', 'LGLGLG': '7', 'LGLGGL': '8', 'LGGLGL': '9',
+}
+# Erro máximo (soma das diferenças, em módulos) para aceitar um dígito
+ERRO_MAXIMO_DIGITO = 1.6
+LINHAS_VARREDURA = 25
+ALTURA_FAIXA = 5
+
+
+def _corridas(linha):
+    # Larguras das sequências de pixels escuros/claros de uma linha, começando por escura.
+    # A linha é interpolada (4 pontos por pixel) para que as bordas caiam entre pixels:
+    # códigos fotografados de longe têm barras de só 2 ou 3 pixels.
+    linha = np.interp(np.arange(0, len(linha) - 1, 0.25), np.arange(len(linha)), linha)
+    limiar = (np.percentile(linha, 5) + np.percentile(linha, 95)) / 2
+    escuro = linha < limiar
+    mudancas = np.flatnonzero(np.diff(escuro.astype(np.int8))) + 1
+    limites = np.concatenate(([0], mudancas, [len(linha)]))
+    larguras = np.diff(limites)
+    if not escuro[0]:
+        larguras = larguras[1:]
+    return larguras.tolist()
+
+
+def _digito(larguras, padroes):
+    # Dígito cujo padrão mais se aproxima das 4 larguras (normalizadas para 7 módulos)
+    total = sum(larguras)
+    if total == 0:
+        return None, None
+    normalizadas = [largura * 7 / total for largura in larguras]
+    melhor, menor_erro = None, ERRO_MAXIMO_DIGITO
+    for nome_padrao, tabela in padroes:
+        for digito, padrao in tabela.items():
+            erro = sum(abs(a - b) for a, b in zip(normalizadas, padrao))
+            if erro < menor_erro:
+                melhor, menor_erro = (digito, nome_padrao), erro
+    return melhor if melhor else (None, None)
+
+
+def _guarda_ok(larguras, modulo):
+    # Guardas são barras e espaços de 1 módulo
+    return all(0.5 * modulo <= largura <= 1.7 * modulo for largura in larguras)
+
+
+def _decodificar_em(corridas, inicio, digitos_por_lado):
+    # Tenta ler um EAN começando na barra corridas[inicio] (guarda inicial)
+    total_corridas = 3 + digitos_por_lado * 4 * 2 + 5 + 3
+    if inicio + total_corridas > len(corridas):
+        return None
+    trecho = corridas[inicio:inicio + total_corridas]
+    modulo = sum(trecho) / (digitos_por_lado * 14 + 11)
+    meio = 3 + digitos_por_lado * 4
+    if not (_guarda_ok(trecho[:3], modulo) and _guarda_ok(trecho[meio:meio + 5], modulo)
+            and _guarda_ok(trecho[-3:], modulo)):
+        return None
+
+    esquerda, paridade = '', ''
+    padroes_esquerda = [('L', PADROES_L), ('G', PADROES_G)] if digitos_por_lado == 6 else [('L', PADROES_L)]
+    for i in range(digitos_por_lado):
+        digito, nome_padrao = _digito(trecho[3 + i * 4:7 + i * 4], padroes_esquerda)
+        if digito is None:
+            return None
+        esquerda += digito
+        paridade += nome_padrao
+    direita = ''
+    for i in range(digitos_por_lado):
+        posicao = meio + 5 + i * 4
+        digito, _ = _digito(trecho[posicao:posicao + 4], [('R', PADROES_L)])
+        if digito is None:
+            return None
+        direita += digito
+
+    if digitos_por_lado == 4:
+        return esquerda + direita
+    primeiro = PRIMEIRO_DIGITO.get(paridade)
+    return primeiro + esquerda + direita if primeiro else None
+
+
+def decodificar_linha(linha):
+    # Procura um EAN-13 (ou EAN-8) com dígito verificador válido em uma linha de pixels
+    corridas = _corridas(np.asarray(linha, dtype=float))
+    for inicio in range(0, len(corridas), 2):   # índices pares são barras
+        for digitos_por_lado in (6, 4):
+            codigo = _decodificar_em(corridas, inicio, digitos_por_lado)
+            if codigo and ean_valido(pd.Series([codigo]))[0]:
+                return codigo
+    return None
+
+
+@medir('ean.decodificar')
+def decodificar_ean(imagem):
+    # Lê um EAN-13/EAN-8 de uma imagem (arquivo, bytes ou PIL.Image), varrendo linhas
+    # horizontais em ambos os sentidos e, se preciso, a imagem girada 90°. Retorna o
+    # código ou None.
+    from PIL import Image, ImageOps
+    if not isinstance(imagem, Image.Image):
+        imagem = Image.open(imagem)
+    pixels = np.asarray(ImageOps.exif_transpose(imagem).convert('L'), dtype=float)
+    for matriz in (pixels, pixels.T):
+        altura = matriz.shape[0]
+        # Do centro para as bordas: o código costuma estar no meio da foto
+        linhas = np.linspace(altura * 0.1, altura * 0.9, LINHAS_VARREDURA).astype(int)
+        linhas = sorted(linhas, key=lambda y: abs(y - altura / 2))
+        for y in linhas:
+            # Média de uma faixa de linhas: atenua o ruído sem borrar as barras (verticais)
+            faixa = matriz[max(0, y - ALTURA_FAIXA // 2):y + ALTURA_FAIXA // 2 + 1].mean(axis=0)
+            for linha in (faixa, faixa[::-1]):
+                codigo = decodificar_linha(linha)
+                if codigo:
+                    return codigo
+    return None
+
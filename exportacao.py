@@ -0,0 +1,115 @@
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from metricas import medir
+from validade import produtos_com_validade_somente_leitura, status_validade_texto
+
+# Linhas formatadas por vez: só um bloco de texto existe em memória durante a geração
+TAMANHO_BLOCO_EXPORTACAO = 20_000
+COLUNAS_EXPORTACAO = {
+    'CodigoEAN': 'Cód. EAN',
+    'Item': 'Item',
+    'Validade': 'Validade',
+    'Dias Restantes': 'Dias Restantes',
+    'Status': 'Status',
+    'Lote': 'Lote',
+    'Quantidade': 'Quantidade',
+    'Secao': 'Seção',
+    'Registro': 'Data de Registro',
+}
+FORMATOS_EXPORTACAO = {
+    'CSV': ('csv', 'text/csv'),
+    'XLSX': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'PDF': ('pdf', 'application/pdf'),
+}
+
+
+def blocos_exportacao(df, tamanho_bloco=TAMANHO_BLOCO_EXPORTACAO):
+    # Gera a lista ordenada por validade em blocos já formatados. A ordenação guarda só
+    # as posições (argsort), sem criar uma segunda cópia ordenada da tabela inteira.
+    ordem = np.argsort(df['DataValidade'].to_numpy(), kind='stable')
+    for inicio in range(0, len(ordem), tamanho_bloco):
+        bloco = df.iloc[ordem[inicio:inicio + tamanho_bloco]]
+        yield pd.DataFrame({
+            'CodigoEAN': bloco['CodigoEAN'],
+            'Item': bloco['Item'],
+            'Validade': bloco['DataValidade'].dt.strftime('%d/%m/%Y'),
+            'Dias Restantes': bloco['Dias Restantes'],
+            'Status': status_validade_texto(bloco['Dias Restantes']),
+            'Lote': bloco['Lote'],
+            'Quantidade': bloco['Quantidade'],
+            'Secao': bloco['Secao'].astype(object),
+            'Registro': bloco['DataRegistro'].dt.strftime('%d/%m/%Y %H:%M:%S'),
+        }).fillna('')
+
+
+def _escrever_csv(blocos, arquivo):
+    # utf-8-sig e ';' para o Excel em português abrir os acentos e as colunas corretamente
+    for numero, bloco in enumerate(blocos):
+        texto = bloco.to_csv(index=False, header=list(COLUNAS_EXPORTACAO.values()) if numero == 0 else False, sep=';')
+        arquivo.write(texto.encode('utf-8-sig' if numero == 0 else 'utf-8'))
+
+
+def _escrever_xlsx(blocos, arquivo):
+    from openpyxl import Workbook
+    # write_only: as linhas vão direto para o arquivo, sem manter a planilha em memória
+    pasta = Workbook(write_only=True)
+    planilha = pasta.create_sheet("Produtos")
+    planilha.append(list(COLUNAS_EXPORTACAO.values()))
+    for bloco in blocos:
+        for linha in bloco.itertuples(index=False, name=None):
+            planilha.append(linha)
+    pasta.save(arquivo)
+
+
+def _texto_pdf(valor):
+    # Fontes padrão do PDF só cobrem latin-1 (acentos do português incluídos)
+    return str(valor).encode('latin-1', 'replace').decode('latin-1')
+
+
+def _escrever_pdf(blocos, arquivo, titulo):
+    from fpdf import FPDF
+
+    larguras = [30, 62, 20, 14, 36, 25, 15, 28, 37]
+
+    class RelatorioValidade(FPDF):
+        def header(self):
+            self.set_font('Helvetica', 'B', 12)
+            self.cell(0, 8, _texto_pdf(titulo))
+            self.ln(10)
+            self.set_font('Helvetica', 'B', 7)
+            for largura, coluna in zip(larguras, COLUNAS_EXPORTACAO.values()):
+                self.cell(largura, 6, _texto_pdf(coluna), border=1)
+            self.ln(6)
+            self.set_font('Helvetica', '', 7)
+
+    pdf = RelatorioValidade(orientation='L')
+    pdf.set_auto_page_break(True, margin=10)
+    pdf.add_page()
+    for bloco in blocos:
+        for linha in bloco.itertuples(index=False, name=None):
+            for largura, valor in zip(larguras, linha):
+                pdf.cell(largura, 5, _texto_pdf(valor)[:45], border=1)
+            pdf.ln(5)
+    arquivo.write(bytes(pdf.output()))
+
+
+@medir('exportacao')
+def exportar_produtos(secao, formato):
+    # Pensada para o 'data' (callable) do st.download_button: roda em outra thread só
+    # quando o usuário clica, sem travar as reexecuções das outras sessões. O arquivo é
+    # montado em disco bloco a bloco; só o resultado final é lido para a memória. A
+    # tabela em cache é só lida (nunca alterada), então dispensa a cópia defensiva.
+    df = produtos_com_validade_somente_leitura(secao)
+    blocos = blocos_exportacao(df)
+    with tempfile.TemporaryFile() as arquivo:
+        if formato == 'XLSX':
+            _escrever_xlsx(blocos, arquivo)
+        elif formato == 'PDF':
+            _escrever_pdf(blocos, arquivo, f"Controle de Validade - {secao or 'Todas as seções'}")
+        else:
+            _escrever_csv(blocos, arquivo)
+        arquivo.seek(0)
+        return arquivo.read()
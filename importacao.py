@@ -0,0 +1,120 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import adicionar_produtos, carregar_produtos
+from ean import ean_valido
+
+# Linhas validadas por vez: o arquivo nunca é convertido inteiro de uma só vez
+TAMANHO_BLOCO_IMPORTACAO = 50_000
+COLUNAS_OBRIGATORIAS = ['CodigoEAN', 'Item', 'DataValidade']
+COLUNAS_IMPORTACAO = ['CodigoEAN', 'Item', 'DataValidade', 'Lote', 'Quantidade', 'Secao']
+# Um mesmo lote (EAN + lote + validade + seção) não é cadastrado duas vezes
+CHAVE_DUPLICIDADE = ['CodigoEAN', 'Lote', 'DataValidade', 'Secao']
+
+
+def _ler_blocos(arquivo, nome_arquivo, tamanho_bloco):
+    # Gera DataFrames de texto com no máximo 'tamanho_bloco' linhas
+    if nome_arquivo.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+        planilha = load_workbook(arquivo, read_only=True, data_only=True).active
+        linhas = planilha.iter_rows(values_only=True)
+        cabecalho = [str(c).strip() if c is not None else '' for c in next(linhas, [])]
+        bloco = []
+        for linha in linhas:
+            # Datas do Excel chegam como datetime: passam para o mesmo texto ISO do CSV
+            bloco.append(['' if v is None else v.strftime('%Y-%m-%d') if isinstance(v, datetime) else str(v)
+                          for v in linha])
+            if len(bloco) == tamanho_bloco:
+                yield pd.DataFrame(bloco, columns=cabecalho)
+                bloco = []
+        if bloco:
+            yield pd.DataFrame(bloco, columns=cabecalho)
+    else:
+        # Manifestos exportados pelo Excel em português costumam usar ';'
+        primeira_linha = arquivo.readline()
+        arquivo.seek(0)
+        if isinstance(primeira_linha, bytes):
+            primeira_linha = primeira_linha.decode('utf-8', errors='ignore')
+        separador = ';' if primeira_linha.count(';') > primeira_linha.count(',') else ','
+        for bloco in pd.read_csv(arquivo, dtype=str, keep_default_na=False, chunksize=tamanho_bloco,
+                                 sep=separador):
+            bloco.columns = [str(c).strip() for c in bloco.columns]
+            yield bloco
+
+
+def _validar_bloco(bloco, secao_padrao, secoes_validas):
+    # Retorna (linhas válidas tipadas, erros) para um bloco; tudo vetorizado
+    bloco = bloco.reindex(columns=COLUNAS_IMPORTACAO, fill_value='').fillna('')
+    for coluna in COLUNAS_IMPORTACAO:
+        bloco[coluna] = bloco[coluna].astype(str).str.strip()
+
+    datas = pd.to_datetime(bloco['DataValidade'], format='%d/%m/%Y', errors='coerce')
+    datas = datas.fillna(pd.to_datetime(bloco['DataValidade'], format='%Y-%m-%d', errors='coerce'))
+    quantidades = pd.to_numeric(bloco['Quantidade'].replace('', '1'), errors='coerce')
+    secoes = bloco['Secao'].str.upper().replace('', secao_padrao)
+
+    verificacoes = [
+        (bloco['Item'] == '', "Nome do Item vazio"),
+        (~ean_valido(bloco['CodigoEAN']), "Código EAN inválido"),
+        (datas.isna(), "Data de Validade inválida (use DD/MM/AAAA ou AAAA-MM-DD)"),
+        (quantidades.isna() | (quantidades < 1) | (quantidades % 1 != 0), "Quantidade deve ser um inteiro maior que zero"),
+        (~secoes.isin(secoes_validas), "Seção desconhecida"),
+    ]
+    erros = [pd.DataFrame({'Linha': bloco.index[mascara], 'Erro': mensagem})
+             for mascara, mensagem in verificacoes if mascara.any()]
+    invalidas = np.zeros(len(bloco), dtype=bool)
+    for mascara, _ in verificacoes:
+        invalidas |= mascara.to_numpy(dtype=bool)
+
+    validas = pd.DataFrame({
+        'CodigoEAN': bloco['CodigoEAN'],
+        'Item': bloco['Item'],
+        'DataValidade': datas,
+        'Lote': bloco['Lote'],
+        'Quantidade': quantidades,
+        'Secao': secoes,
+    })[~invalidas]
+    validas['Quantidade'] = validas['Quantidade'].astype('int64')
+    return validas, erros
+
+
+def importar_produtos(arquivo, nome_arquivo, secao_padrao, secoes_validas, tamanho_bloco=TAMANHO_BLOCO_IMPORTACAO):
+    # Importa um manifesto CSV/XLSX com as colunas CodigoEAN, Item, DataValidade e,
+    # opcionalmente, Lote, Quantidade e Secao. Valida em blocos, descarta lotes repetidos
+    # (no arquivo ou já cadastrados) e grava tudo em uma única escrita em lote.
+    # Retorna (quantidade importada, quantidade de duplicados, DataFrame de erros por linha).
+    validos, erros = [], []
+    inicio = 0
+    for bloco in _ler_blocos(arquivo, nome_arquivo, tamanho_bloco):
+        faltando = [c for c in COLUNAS_OBRIGATORIAS if c not in bloco.columns]
+        if faltando:
+            raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(faltando)}")
+        # Número da linha no arquivo original (a linha 1 é o cabeçalho)
+        bloco.index = pd.RangeIndex(inicio + 2, inicio + 2 + len(bloco))
+        inicio += len(bloco)
+        bloco_validos, bloco_erros = _validar_bloco(bloco, secao_padrao, secoes_validas)
+        validos.append(bloco_validos)
+        erros.extend(bloco_erros)
+
+    if erros:
+        df_erros = pd.concat(erros).sort_values('Linha', kind='stable').reset_index(drop=True)
+    else:
+        df_erros = pd.DataFrame(columns=['Linha', 'Erro'])
+    if not validos:
+        return 0, 0, df_erros
+    df_novos = pd.concat(validos)
+
+    # Duplicados dentro do próprio arquivo e contra o que já está cadastrado
+    total_antes = len(df_novos)
+    df_novos = df_novos.drop_duplicates(subset=CHAVE_DUPLICIDADE)
+    existentes = carregar_produtos()
+    if not existentes.empty:
+        chaves_existentes = pd.MultiIndex.from_frame(existentes[CHAVE_DUPLICIDADE].astype({'Secao': object}))
+        df_novos = df_novos[~pd.MultiIndex.from_frame(df_novos[CHAVE_DUPLICIDADE]).isin(chaves_existentes)]
+    duplicados = total_antes - len(df_novos)
+
+    if not df_novos.empty:
+        adicionar_produtos(df_novos)
+    return len(df_novos), duplicados, df_erros
@@ -0,0 +1,71 @@
+import os
+import threading
+
+import pandas as pd
+
+from armazenamento import (
+    PASTA_DADOS, carregar_usuarios, existe_status_app, inicializar_produtos, obter_usuario,
+    salvar_status_app, salvar_usuarios, travar_arquivo,
+)
+from arquivamento import iniciar_arquivamento_automatico, migrar_arquivo_sem_loja
+from autenticacao import hash_senha
+from metricas import medir
+
+# --- Inicialização do Processo ---
+# Migrações, admin padrão e status inicial rodam uma vez por processo do servidor, não a
+# cada reexecução do script. A primeira sessão faz o trabalho; as que chegam ao mesmo
+# tempo esperam a trava e depois seguem sem tocar no disco. A trava de arquivo cobre
+# outro processo (outra réplica do servidor) inicializando a mesma pasta de dados.
+INICIALIZACAO_LOCK = os.path.join(PASTA_DADOS, 'inicializacao.lock')
+
+_trava = threading.Lock()
+_inicializado = False
+
+
+def inicializar_dados():
+    # Migra formatos antigos e cria o arquivo de produtos se não existir
+    for mensagem in inicializar_produtos() + migrar_arquivo_sem_loja():
+        print(mensagem)
+
+    # Inicializa usuarios.csv e garante que o admin está lá
+    if obter_usuario('admin') is None:
+        df_usuarios = carregar_usuarios()
+        admin_usuario = "admin"
+        admin_senha_plain = "123456" # Senha para o admin
+        admin_secao = "Admin"
+        admin_senha_hashed = hash_senha(admin_senha_plain)
+
+        novo_admin_df = pd.DataFrame([{
+            'Usuario': admin_usuario,
+            'Senha': admin_senha_hashed,
+            'Secao': admin_secao
+        }])
+
+        if df_usuarios.empty:
+            df_usuarios = novo_admin_df
+        else:
+            df_usuarios = pd.concat([df_usuarios, novo_admin_df], ignore_index=True)
+
+        salvar_usuarios(df_usuarios)
+        print(f"Usuário 'admin' com senha '{admin_senha_plain}' adicionado/garantido.")
+
+    # Inicializa o status do aplicativo se ainda não existir
+    if not existe_status_app():
+        salvar_status_app("azul", "Tudo operando") # Status padrão
+        print("Status do aplicativo inicializado.")
+
+
+def garantir_inicializacao():
+    # Chamada no topo do app.py a cada reexecução; depois da primeira, só confere a flag.
+    # Se a inicialização falhar, a flag continua falsa e a próxima reexecução tenta de novo.
+    global _inicializado
+    if _inicializado:
+        return
+    with _trava:
+        if _inicializado:
+            return
+        with medir('inicializacao'), travar_arquivo(INICIALIZACAO_LOCK):
+            inicializar_dados()
+        # Varredura periódica que move os lotes vencidos há muito tempo para o arquivo morto
+        iniciar_arquivamento_automatico()
+        _inicializado = True
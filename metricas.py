@@ -0,0 +1,192 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# --- Métricas de Desempenho ---
+# Tempos e contadores em memória, por processo. Cada etapa medida acumula chamadas, tempo
+# total e tempo máximo por (etapa, seção); a seção é a do usuário da reexecução em
+# andamento na thread (o Streamlit roda o script de cada sessão na sua própria thread) e
+# fica vazia em tarefas de segundo plano, como a compactação e o arquivamento.
+# Os tempos incluem as etapas internas: 'armazenamento.ler_produtos' já contém a leitura
+# do arquivo e 'transformacao.tipar_produtos'.
+
+# Arquivo no formato texto do Prometheus, regravado ao fim das reexecuções (no máximo a
+# cada INTERVALO_ARQUIVO_METRICAS segundos), para o coletor 'textfile' do node_exporter.
+# Vazio (padrão) desliga a gravação; as métricas continuam na Área do Administrador.
+ARQUIVO_METRICAS = os.environ.get('ARQUIVO_METRICAS', '')
+INTERVALO_ARQUIVO_METRICAS = float(os.environ.get('INTERVALO_ARQUIVO_METRICAS', 15))
+PREFIXO_METRICAS = 'controle_validade'
+# Limites (em segundos) do histograma de duração das reexecuções
+LIMITES_REEXECUCAO = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+_trava = threading.Lock()
+_tempos = defaultdict(lambda: [0, 0.0, 0.0])             # (etapa, secao) -> [chamadas, total, maximo]
+_contadores = defaultdict(int)                           # (operacao, secao) -> total
+_reexecucoes = defaultdict(lambda: [0] * (len(LIMITES_REEXECUCAO) + 1))  # secao -> contagem por faixa
+_local = threading.local()
+_arquivo_gravado_em = 0.0
+_inicio_processo = time.time()
+
+
+def _execucao_atual():
+    return getattr(_local, 'execucao', None)
+
+
+def registrar_tempo(etapa, segundos):
+    execucao = _execucao_atual()
+    secao = execucao['secao'] if execucao else ''
+    with _trava:
+        acumulado = _tempos[(etapa, secao)]
+        acumulado[0] += 1
+        acumulado[1] += segundos
+        acumulado[2] = max(acumulado[2], segundos)
+    if execucao:
+        da_execucao = execucao['tempos'].setdefault(etapa, [0, 0.0])
+        da_execucao[0] += 1
+        da_execucao[1] += segundos
+
+
+@contextmanager
+def medir(etapa):
+    # Bloco 'with medir(...)' ou decorador '@medir(...)'
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar_tempo(etapa, time.perf_counter() - inicio)
+
+
+def contar(operacao, quantidade=1):
+    # Leituras e escritas de arquivo, consultas ao banco etc.
+    execucao = _execucao_atual()
+    secao = execucao['secao'] if execucao else ''
+    with _trava:
+        _contadores[(operacao, secao)] += quantidade
+    if execucao:
+        execucao['contadores'][operacao] = execucao['contadores'].get(operacao, 0) + quantidade
+
+
+# --- Reexecuções do Script ---
+def iniciar_execucao(secao):
+    # Chamado no início do app.py: tudo o que for medido nesta thread até
+    # finalizar_execucao() conta para esta reexecução
+    _local.execucao = {'secao': secao or '', 'inicio': time.perf_counter(), 'tempos': {}, 'contadores': {}}
+
+
+def finalizar_execucao():
+    # Registra a duração total e retorna o resumo da reexecução:
+    # {'secao', 'duracao_s', 'tempos': {etapa: [chamadas, total]}, 'contadores': {operacao: total}}
+    execucao = _execucao_atual()
+    if execucao is None:
+        return None
+    _local.execucao = None
+    duracao = time.perf_counter() - execucao['inicio']
+    secao = execucao['secao']
+    faixa = next((i for i, limite in enumerate(LIMITES_REEXECUCAO) if duracao <= limite), len(LIMITES_REEXECUCAO))
+    with _trava:
+        acumulado = _tempos[('reexecucao', secao)]
+        acumulado[0] += 1
+        acumulado[1] += duracao
+        acumulado[2] = max(acumulado[2], duracao)
+        _reexecucoes[secao][faixa] += 1
+    _gravar_arquivo_se_preciso()
+    return {'secao': secao, 'duracao_s': duracao, 'tempos': execucao['tempos'], 'contadores': execucao['contadores']}
+
+
+# --- Consulta e Exportação ---
+def resumo_tempos():
+    # Lista de (etapa, secao, chamadas, total_s, maximo_s)
+    with _trava:
+        return [(etapa, secao, *valores) for (etapa, secao), valores in _tempos.items()]
+
+
+def resumo_contadores():
+    # Lista de (operacao, secao, total)
+    with _trava:
+        return [(operacao, secao, total) for (operacao, secao), total in _contadores.items()]
+
+
+def zerar_metricas():
+    global _inicio_processo
+    with _trava:
+        _tempos.clear()
+        _contadores.clear()
+        _reexecucoes.clear()
+        _inicio_processo = time.time()
+
+
+def _rotulo(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def texto_prometheus():
+    # Métricas no formato de exposição em texto do Prometheus
+    with _trava:
+        tempos = sorted(_tempos.items())
+        contadores = sorted(_contadores.items())
+        reexecucoes = sorted((secao, list(faixas)) for secao, faixas in _reexecucoes.items())
+        inicio = _inicio_processo
+
+    nome = f'{PREFIXO_METRICAS}_etapa_segundos'
+    linhas = [
+        f'# HELP {nome} Tempo gasto por etapa (inclui as etapas internas).',
+        f'# TYPE {nome} summary',
+    ]
+    for (etapa, secao), (chamadas, total, _) in tempos:
+        rotulos = f'etapa="{_rotulo(etapa)}",secao="{_rotulo(secao)}"'
+        linhas.append(f'{nome}_count{{{rotulos}}} {chamadas}')
+        linhas.append(f'{nome}_sum{{{rotulos}}} {total:.6f}')
+    linhas += [
+        f'# HELP {nome}_max Maior tempo de uma chamada da etapa.',
+        f'# TYPE {nome}_max gauge',
+    ]
+    for (etapa, secao), (_, _, maximo) in tempos:
+        linhas.append(f'{nome}_max{{etapa="{_rotulo(etapa)}",secao="{_rotulo(secao)}"}} {maximo:.6f}')
+
+    nome = f'{PREFIXO_METRICAS}_reexecucao_segundos'
+    linhas += [
+        f'# HELP {nome} Duração das reexecuções do script por seção do usuário.',
+        f'# TYPE {nome} histogram',
+    ]
+    for secao, faixas in reexecucoes:
+        acumulado = 0
+        for limite, quantidade in zip(LIMITES_REEXECUCAO + ['+Inf'], faixas):
+            acumulado += quantidade
+            linhas.append(f'{nome}_bucket{{secao="{_rotulo(secao)}",le="{limite}"}} {acumulado}')
+        total = next((valores[1] for (etapa, s), valores in tempos if etapa == 'reexecucao' and s == secao), 0.0)
+        linhas.append(f'{nome}_count{{secao="{_rotulo(secao)}"}} {acumulado}')
+        linhas.append(f'{nome}_sum{{secao="{_rotulo(secao)}"}} {total:.6f}')
+
+    nome = f'{PREFIXO_METRICAS}_operacoes_total'
+    linhas += [
+        f'# HELP {nome} Operações de E/S (leituras e escritas de arquivo, consultas ao banco).',
+        f'# TYPE {nome} counter',
+    ]
+    for (operacao, secao), total in contadores:
+        linhas.append(f'{nome}{{operacao="{_rotulo(operacao)}",secao="{_rotulo(secao)}"}} {total}')
+
+    nome = f'{PREFIXO_METRICAS}_inicio_coleta_segundos'
+    linhas += [
+        f'# HELP {nome} Momento (epoch) em que a coleta começou ou foi zerada.',
+        f'# TYPE {nome} gauge',
+        f'{nome} {inicio:.0f}',
+    ]
+    return '\n'.join(linhas) + '\n'
+
+
+def _gravar_arquivo_se_preciso():
+    global _arquivo_gravado_em
+    if not ARQUIVO_METRICAS:
+        return
+    agora = time.monotonic()
+    with _trava:
+        if agora - _arquivo_gravado_em < INTERVALO_ARQUIVO_METRICAS:
+            return
+        _arquivo_gravado_em = agora
+    # Troca atômica: o coletor nunca lê o arquivo pela metade
+    caminho_tmp = f'{ARQUIVO_METRICAS}.{os.getpid()}.tmp'
+    with open(caminho_tmp, 'w', encoding='utf-8') as f:
+        f.write(texto_prometheus())
+    os.replace(caminho_tmp, ARQUIVO_METRICAS)
@@ -0,0 +1,138 @@
+import threading
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from armazenamento import backend_armazenamento, carregar_produtos, registrar_observador, versao_produtos
+from metricas import medir
+from validade import LIMITE_ATENCAO, classificar_validade, dia_absoluto, hoje
+
+SEMANAS_PAINEL = 12
+
+
+def _agrupar(df):
+    # (seção, dia de validade) -> [quantidade, lotes] de um DataFrame de produtos
+    df = df[df['DataValidade'].notna()]
+    grupos = pd.DataFrame({
+        'Secao': df['Secao'].astype(object).to_numpy(),
+        'Dia': dia_absoluto(df['DataValidade']),
+        'Quantidade': df['Quantidade'].to_numpy(),
+    }).groupby(['Secao', 'Dia'])['Quantidade'].agg(['sum', 'size'])
+    return zip(grupos.index, grupos['sum'].tolist(), grupos['size'].tolist())
+
+
+def _montar_tabela(totais, data_referencia):
+    # Totais como DataFrame (Secao, Dia, Quantidade, Lotes, Faixa, Semana)
+    chaves = list(totais)
+    valores = np.array(list(totais.values()), dtype=np.int64).reshape(-1, 2)
+    df = pd.DataFrame({
+        'Secao': [secao for secao, _ in chaves],
+        'Dia': np.array([dia for _, dia in chaves], dtype=np.int64),
+        'Quantidade': valores[:, 0],
+        'Lotes': valores[:, 1],
+    })
+    dia_hoje = int(dia_absoluto([data_referencia])[0])
+    df['Dias Restantes'] = df['Dia'] - dia_hoje
+    df['Faixa'] = classificar_validade(df['Dias Restantes'])
+    # Semanas começando na segunda-feira (1970-01-01 foi uma quinta-feira)
+    df['Semana'] = pd.to_datetime(df['Dia'] - (df['Dia'] + 3) % 7, unit='D')
+    return df
+
+
+class AgregadosValidade:
+    # Quantidade e número de lotes somados por (seção, dia de validade). Com dezenas de
+    # seções e alguns anos de datas, são poucos milhares de chaves mesmo com milhões de
+    # produtos: os gráficos saem dessa tabela, não do estoque. Escritas deste processo
+    # somam ou subtraem só as linhas alteradas; escritas de fora reconstroem a tabela.
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.versao = None
+        self.totais = defaultdict(lambda: [0, 0])
+        self._tabelas = {}
+
+    def _somar(self, df, sinal):
+        for chave, quantidade, lotes in _agrupar(df):
+            total = self.totais[chave]
+            total[0] += sinal * quantidade
+            total[1] += sinal * lotes
+            if total[1] <= 0:
+                del self.totais[chave]
+
+    @medir('transformacao.agregados_painel')
+    def reconstruir(self, versao):
+        self.totais = defaultdict(lambda: [0, 0])
+        self._somar(carregar_produtos(), 1)
+        # Versão que mudou durante a leitura: os totais podem já conter a escrita nova
+        self.versao = versao if versao_produtos() == versao else None
+        self._tabelas = {}
+
+    def ao_escrever(self, evento, dados, versao_antes, versao_depois, anteriores):
+        with self._trava:
+            if self.versao is None or self.versao != versao_antes:
+                self.versao = None
+                return
+            # Uma alteração chega como a linha anterior (subtraída) mais a nova (somada)
+            self._somar(anteriores, -1)
+            if evento == 'inserir':
+                self._somar(dados, 1)
+            self.versao = versao_depois
+            self._tabelas = {}
+
+    def tabela(self):
+        # Totais como DataFrame (Secao, Dia, Quantidade, Lotes, Faixa), montado uma vez
+        # por versão dos dados e por dia (as faixas dependem da data de hoje)
+        with self._trava:
+            versao = versao_produtos()
+            if self.versao != versao:
+                self.reconstruir(versao)
+            data_referencia = hoje()
+            if data_referencia not in self._tabelas:
+                self._tabelas = {data_referencia: _montar_tabela(self.totais, data_referencia)}
+            return self._tabelas[data_referencia]
+
+
+_agregados = AgregadosValidade()
+registrar_observador(_agregados.ao_escrever)
+
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+@medir('transformacao.agregados_painel')
+def _tabela_da_secao(versao, data_referencia, secao):
+    # Bancos e armazenamento particionado: só a seção é lida (pelo índice ou pela
+    # partição), sem somar a loja inteira
+    totais = {chave: [quantidade, lotes] for chave, quantidade, lotes in _agrupar(carregar_produtos(secao))}
+    return _montar_tabela(totais, data_referencia)
+
+
+def _tabela_secao(secao):
+    if secao is not None and backend_armazenamento().filtra_no_banco:
+        return _tabela_da_secao(versao_produtos(), hoje(), secao)
+    df = _agregados.tabela()
+    return df if secao is None else df[df['Secao'] == secao]
+
+
+def quantidade_em_risco_por_secao(secao=None):
+    # Quantidade vencida ou vencendo em até LIMITE_ATENCAO dias, por seção e faixa
+    df = _tabela_secao(secao)
+    df = df[df['Dias Restantes'] <= LIMITE_ATENCAO]
+    return (df.groupby(['Secao', 'Faixa'], observed=True)['Quantidade'].sum()
+            .reset_index().sort_values('Secao'))
+
+
+def vencimentos_por_semana(semanas=SEMANAS_PAINEL, secao=None):
+    # Quantidade e lotes que vencem em cada uma das próximas 'semanas' semanas, por seção
+    df = _tabela_secao(secao)
+    df = df[(df['Dias Restantes'] >= 0) & (df['Dias Restantes'] < semanas * 7)]
+    return df.groupby(['Semana', 'Secao'])[['Quantidade', 'Lotes']].sum().reset_index()
+
+
+def vencidos_por_semana(semanas=SEMANAS_PAINEL, secao=None):
+    # Quantidade que venceu em cada uma das últimas 'semanas' semanas e o acumulado
+    df = _tabela_secao(secao)
+    df = df[(df['Dias Restantes'] < 0) & (df['Dias Restantes'] >= -semanas * 7)]
+    df = df.groupby('Semana')[['Quantidade', 'Lotes']].sum().reset_index()
+    df['Quantidade Acumulada'] = df['Quantidade'].cumsum()
+    return df
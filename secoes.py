@@ -0,0 +1,9 @@
+# --- Seções ---
+# Em um módulo próprio para que outros módulos (e os benchmarks) usem a mesma lista sem
+# importar a interface
+SECOES = [
+    "AÇOUGUE", "PADARIA", "FRIOS", "LATICÍNIOS", "HORTIFRÚTIS", "ENLATADOS",
+    "BEBIDAS", "MATINAL", "CEREAIS", "PERFUMARIA", "BISCOITOS", "BAZAR",
+    "LIMPEZA", "DOCES/BOMBOM", "MASSAS", "CONDIMENTOS", "INTEGRAL"
+]
+NIVEIS_ACESSO = ["Admin", "Gerência"] + SECOES
@@ -0,0 +1,47 @@
+-- Esquema do backend 'supabase' (BACKEND_ARMAZENAMENTO=supabase).
+-- Execute uma vez no editor SQL do Supabase, ou em um Postgres local servido pelo PostgREST.
+
+CREATE TABLE IF NOT EXISTS produtos (
+    "ID" text PRIMARY KEY,
+    "CodigoEAN" text NOT NULL,
+    "Item" text NOT NULL,
+    "DataValidade" date,
+    "Lote" text,
+    "Quantidade" integer,
+    "DataRegistro" timestamp,
+    "Secao" text
+);
+-- Lista de uma seção ordenada por validade (e filtros por intervalo de datas) usam o índice
+CREATE INDEX IF NOT EXISTS idx_produtos_secao_validade ON produtos ("Secao", "DataValidade");
+CREATE INDEX IF NOT EXISTS idx_produtos_ean ON produtos ("CodigoEAN");
+
+CREATE TABLE IF NOT EXISTS usuarios (
+    "Usuario" text PRIMARY KEY,
+    "Senha" text NOT NULL,
+    "Secao" text NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS status_app (
+    id integer PRIMARY KEY CHECK (id = 1),
+    status text NOT NULL,
+    mensagem text NOT NULL
+);
+
+-- 'versao' muda a cada escrita nos produtos, vinda de qualquer loja; os caches locais usam essa chave
+CREATE TABLE IF NOT EXISTS meta (
+    chave text PRIMARY KEY,
+    valor bigint NOT NULL
+);
+INSERT INTO meta (chave, valor) VALUES ('versao', 0) ON CONFLICT (chave) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION incrementar_versao_produtos() RETURNS trigger AS $$
+BEGIN
+    UPDATE meta SET valor = valor + 1 WHERE chave = 'versao';
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS produtos_versao ON produtos;
+CREATE TRIGGER produtos_versao
+    AFTER INSERT OR UPDATE OR DELETE ON produtos
+    FOR EACH STATEMENT EXECUTE FUNCTION incrementar_versao_produtos();
@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+from PIL import Image, ImageDraw
+
+import ean
+from ean import PADROES_G, PADROES_L, PRIMEIRO_DIGITO, decodificar_ean, ean_valido
+
+PIXELS_POR_MODULO = 3
+MARGEM_MODULOS = 10
+
+
+def _larguras(codigo):
+    # Larguras (em módulos) das barras e espaços do código, alternadas a partir de uma barra
+    metade = len(codigo) // 2
+    if len(codigo) == 13:
+        paridade = next(p for p, primeiro in PRIMEIRO_DIGITO.items() if primeiro == codigo[0])
+        esquerda, direita = codigo[1:7], codigo[7:]
+    else:
+        paridade = 'L' * metade
+        esquerda, direita = codigo[:metade], codigo[metade:]
+    larguras = [1, 1, 1]
+    for digito, tabela in zip(esquerda, paridade):
+        larguras.extend((PADROES_L if tabela == 'L' else PADROES_G)[digito])
+    larguras.extend([1, 1, 1, 1, 1])
+    for digito in direita:
+        larguras.extend(PADROES_L[digito])
+    larguras.extend([1, 1, 1])
+    return larguras
+
+
+def _imagem(codigo, altura=80):
+    larguras = _larguras(codigo)
+    largura_total = (sum(larguras) + 2 * MARGEM_MODULOS) * PIXELS_POR_MODULO
+    imagem = Image.new('L', (largura_total, altura), 255)
+    desenho = ImageDraw.Draw(imagem)
+    x = MARGEM_MODULOS * PIXELS_POR_MODULO
+    for i, modulos in enumerate(larguras):
+        if i % 2 == 0:
+            desenho.rectangle([x, 0, x + modulos * PIXELS_POR_MODULO - 1, altura - 1], fill=0)
+        x += modulos * PIXELS_POR_MODULO
+    return imagem
+
+
+def test_ean_valido():
+    eans = pd.Series(['7891000100103', '96385074', '7891000100104', '789100010010', 'abc', ''])
+    assert ean_valido(eans).tolist() == [True, True, False, False, False, False]
+
+
+def test_decodifica_ean13():
+    assert decodificar_ean(_imagem('7891000100103')) == '7891000100103'
+
+
+def test_decodifica_ean8():
+    assert decodificar_ean(_imagem('96385074')) == '96385074'
+
+
+def test_decodifica_imagem_girada():
+    assert decodificar_ean(_imagem('4006381333931').rotate(90, expand=True)) == '4006381333931'
+
+
+def test_sem_codigo():
+    assert decodificar_ean(Image.new('L', (200, 80), 255)) is None
+
+
+def test_importar_ean_nao_carrega_streamlit_nem_armazenamento():
+    carregados = subprocess.run(
+        [sys.executable, '-c', "import sys, ean; print(' '.join(sorted(sys.modules)))"],
+        capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(ean.__file__)),
+    ).stdout.split()
+    assert 'streamlit' not in carregados
+    assert 'armazenamento' not in carregados
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from armazenamento import carregar_produtos, versao_produtos
+from metricas import medir
+
+# --- Faixas de Validade ---
+LIMITE_CRITICO = 5   # Vence em até 5 dias (laranja)
+LIMITE_ATENCAO = 30  # Vence em até 30 dias (amarelo)
+FAIXAS_VALIDADE = ['vencido', 'critico', 'atencao', 'retido']
+CORES_FAIXAS = {'vencido': 'red', 'critico': 'orange', 'atencao': 'yellow', 'retido': 'green'}
+
+
+def hoje():
+    # Dias restantes só mudam à meia-noite: a data (sem hora) é a chave dos caches
+    return pd.Timestamp.today().normalize()
+
+
+def dia_absoluto(datas):
+    # Dias desde 1970-01-01 (inteiros): chave dos índices e agregados por dia de validade
+    return pd.to_datetime(datas).to_numpy(dtype='datetime64[ns]').astype('datetime64[D]').astype(np.int64)
+
+
+def dias_restantes(datas_validade, data_referencia):
+    return (pd.to_datetime(datas_validade, errors='coerce') - data_referencia).dt.days
+
+
+def classificar_validade(dias):
+    # Equivalente vetorizado dos if/elif por linha; datas inválidas (NaN) ficam sem faixa
+    codigos = np.select(
+        [dias < 0, dias <= LIMITE_CRITICO, dias <= LIMITE_ATENCAO, dias > LIMITE_ATENCAO],
+        [0, 1, 2, 3],
+        default=-1,
+    )
+    return pd.Categorical.from_codes(codigos, categories=FAIXAS_VALIDADE)
+
+
+def _texto_status(dias):
+    if dias < 0:
+        return f'VENCIDO ({abs(dias)} dias)'
+    elif dias <= LIMITE_ATENCAO:
+        return f'Vence em {dias} dias'
+    else:
+        return f'Retido ({dias} dias)'
+
+
+def _cor_status(dias):
+    if dias < 0:
+        return CORES_FAIXAS['vencido']
+    elif dias <= LIMITE_CRITICO:
+        return CORES_FAIXAS['critico']
+    elif dias <= LIMITE_ATENCAO:
+        return CORES_FAIXAS['atencao']
+    else:
+        return CORES_FAIXAS['retido']
+
+
+def _html_status(dias):
+    return f'<span style="color:{_cor_status(dias)}; font-weight:bold;">{_texto_status(dias)}</span>'
+
+
+def _formatar_por_valor(dias, formatar, texto_sem_data):
+    # Há poucas centenas de valores distintos de dias mesmo com milhões de linhas:
+    # formata cada valor uma única vez e distribui o resultado com um take vetorizado.
+    # O código -1 (data inválida) cai no último elemento, o texto_sem_data.
+    codigos, valores = pd.factorize(dias)
+    textos = np.array([formatar(int(v)) for v in valores] + [texto_sem_data], dtype=object)
+    return pd.Series(textos[codigos], index=dias.index)
+
+
+def status_validade_texto(dias):
+    return _formatar_por_valor(dias, _texto_status, 'Validade não informada')
+
+
+def status_validade_html(dias):
+    return _formatar_por_valor(
+        dias, _html_status, '<span style="color:gray; font-weight:bold;">Validade não informada</span>'
+    )
+
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+@medir('transformacao.produtos_com_validade')
+def _produtos_com_validade(versao, data_referencia, secao=None):
+    # Calculado uma vez por versão dos dados, por dia e por seção, já ordenado por
+    # validade: a lista paginada só recorta a página, sem reordenar a cada reexecução
+    df = carregar_produtos(secao)
+    df['Dias Restantes'] = dias_restantes(df['DataValidade'], data_referencia)
+    df['FaixaValidade'] = classificar_validade(df['Dias Restantes'])
+    return df.sort_values('DataValidade', kind='stable').reset_index(drop=True)
+
+
+def carregar_produtos_com_validade(secao=None):
+    # Produtos com as colunas 'Dias Restantes' e 'FaixaValidade' já calculadas
+    return _produtos_com_validade(versao_produtos(), hoje(), secao).copy()
+
+
+def produtos_com_validade_somente_leitura(secao=None):
+    # A mesma tabela, sem cópia: compartilhada entre as sessões, não pode ser alterada
+    # (quem precisa alterar recorta antes, como a página da lista, ou usa a função acima)
+    return _produtos_com_validade(versao_produtos(), hoje(), secao)